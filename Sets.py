@@ -6,12 +6,18 @@ import pytz
 from snowflake.snowpark import Session
 from snowflake.snowpark.functions import col
 from transformation.appointments_data import process_appointments_data  # Import the function
+from transformation.prefetch import start_prefetcher
+from features.perf_panel import perf_panel
+from features.live import live_fragment, rerun_on_new_day
 
 st.set_page_config(
     page_title="Daily Set Goals",
     layout="wide"
 )
 
+# Keep the cached queries warm in the background (one scheduler per process)
+start_prefetcher()
+
 st.logo("https://res.cloudinary.com/dwuzrptk6/image/upload/v1732139306/d97489eb-0834-40e3-a5b5-e93c2f0066b3_1-removebg-preview_1_z60jh6.png", size="large")
 
 hide_streamlit_style = """
@@ -74,89 +80,40 @@ else:
 def get_appointments_data(start_date, end_date):
     return process_appointments_data((start_date, end_date))
 
-# Fetch the data
-df = get_appointments_data(start_date, end_date)
+from features.progress_bar import card_html, create_cards, PROFILE_PICTURE_SIZE  # Import card renderers from progress_bar
+from transformation.image_cache import thumbnail
 
-from features.progress_bar import create_card  # Import create_card from progress_bar
+# The cards refresh themselves in live mode; the rest of the page only reruns on interaction
+@live_fragment
+def area_cards():
+    rerun_on_new_day(now.date(), local_tz)
 
-st.markdown("""
-    <style>
-    .card {
-        background-color: #41434A;
-        padding: 10px;
-        border-radius: 10px;
-        margin-bottom: 5px;
-        color: white;
-        position: relative;
-    }
-    .profile-section {
-        display: flex;
-        align-items: center;
-        margin-bottom: 8px;
-    }
-    .profile-pic {
-        border-radius: 50%;
-        width: 45px;
-        height: 45px;
-        margin-right: 15px;
-    }
-    .name {
-        font-size: 16px;
-        font-weight: bold;
-    }
-    .appointments {
-        font-size: 16px;
-        margin-bottom: 10px;
-        color: white;
-    }
-    .progress-bar {
-        background-color: #37383C;
-        border-radius: 25px;
-        width: 100%;
-        height: 20px;
-        position: relative;
-        margin-bottom: 10px;
-    }
-    .progress-bar-fill {
-        background-color: #C34547;
-        height: 100%;
-        border-radius: 25px;
-    }
-    .goal {
-        position: absolute;
-        right: 5px;
-        top: 50%;
-        transform: translateY(-50%);
-        font-size: 16px;
-        color: white;
-        font-weight: bold;
-    ._container_51w34_1 {
-        display: none !important;
-    }
-    }
-    </style>
-""", unsafe_allow_html=True)
+    # Fetch the data
+    df = get_appointments_data(start_date, end_date)
 
-# Calculate total goals and actuals
-total_goals = df['GOALS'].sum()
-total_actual = df['ID'].sum()
+    # Calculate total goals and actuals
+    total_goals = df['GOALS'].sum()
+    total_actual = df['ID'].sum()
 
-with st.container():
-    create_card(
-        area='All Areas',
+    # Purelight total on top, then one card per area
+    total_card = card_html(
         goal=total_goals,
         actual=total_actual,
-        profile_image='https://res.cloudinary.com/dwuzrptk6/image/upload/v1732061718/Group_1147_ad1zmf.png',
+        profile_image=thumbnail('https://res.cloudinary.com/dwuzrptk6/image/upload/v1732061718/Group_1147_ad1zmf.png', PROFILE_PICTURE_SIZE),
         name='Purelight'
     )
 
-columns = st.columns(3)
-for idx, row in df.iterrows():
-    with columns[idx % 3]:
-        create_card(
-            area=row['AREA'],
-            goal=row['GOALS'],
-            actual=row['ID'],
-            profile_image=row['PROFILE_PICTURE'],
-            name=row['AREA']
-        )
\ No newline at end of file
+    create_cards(
+        df,
+        goal_col='GOALS',
+        actual_col='ID',
+        image_col='PROFILE_PICTURE',
+        name_col='AREA',
+        num_columns=3,
+        header=total_card
+    )
+
+area_cards()
+
+# Timings panel, shown with ?perf=1 in the URL
+perf_panel()
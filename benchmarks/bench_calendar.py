@@ -0,0 +1,113 @@
+# Compare the area × day calendar build in process_appointments_data before and after
+# the vectorized calendar_grid helpers, and the DailyCube prefix-sum lookup that replaced it
+# (the cube is built once per data refresh; "cube build" is that one-off cost). Run from the repo root:
+#
+#   python benchmarks/bench_calendar.py
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transformation.calendar_grid import DailyCube, area_day_index, daily_counts, area_totals
+
+AREAS = [f"Area {i}" for i in range(17)]
+DAY_COUNTS = [1, 7, 30, 90, 180, 365]
+APPOINTMENTS_PER_AREA_PER_DAY = 5
+
+def synthetic_appointments(start_date, end_date, seed=0):
+    rng = np.random.default_rng(seed)
+    days = (end_date - start_date).days + 1
+    n = len(AREAS) * days * APPOINTMENTS_PER_AREA_PER_DAY
+    created_at = pd.Timestamp(start_date) + pd.to_timedelta(rng.integers(0, days * 86400, n), unit="s")
+    return pd.DataFrame({
+        "CREATED_AT": created_at,
+        "ID": np.arange(n),
+        "AREA": rng.choice(AREAS, n),
+        "GOALS": 5,
+        "PROFILE_PICTURE": None,
+    })
+
+def legacy_calendar(df, start_date, end_date):
+    # The list-comprehension + merge version this replaced
+    df = df.copy()
+    df['CREATED_AT'] = pd.to_datetime(df['CREATED_AT']).dt.date
+    date_range = pd.date_range(start=start_date, end=end_date)
+    daily_goals_dict = df.groupby('AREA')['GOALS'].first().to_dict()
+    all_areas = df['AREA'].unique().tolist()
+    goals_df = pd.DataFrame(
+        [
+            (area, daily_goals_dict.get(area, 0) if single_date.weekday() < 5 else 0, single_date.date(), '')
+            for area in all_areas
+            for single_date in date_range
+        ],
+        columns=['AREA', 'GOALS', 'CREATED_AT', 'PROFILE_PICTURE']
+    )
+    goals_df['CREATED_AT'] = pd.to_datetime(goals_df['CREATED_AT']).dt.date
+    df = df.drop(columns=['GOALS', 'PROFILE_PICTURE'])
+    df = df.merge(goals_df, on=['AREA', 'CREATED_AT'], how='outer')
+    df = df[(df['CREATED_AT'] >= start_date) & (df['CREATED_AT'] <= end_date)]
+    daily_df = df.groupby(['AREA', 'CREATED_AT']).agg({'ID': 'count', 'GOALS': 'first'}).reset_index()
+    return daily_df.groupby('AREA').agg({'ID': 'sum', 'GOALS': 'sum'})
+
+def weekday_goals(index, goals_by_area):
+    # Each area's daily goal on weekdays, 0 on Saturday/Sunday (the vectorized version's goals,
+    # which DailyCube.goals replaced with a business-day count)
+    goals = index.get_level_values('AREA').map(goals_by_area).to_numpy(dtype=float, na_value=0)
+    weekdays = np.asarray(index.get_level_values(-1).dayofweek < 5)
+    return pd.Series(np.where(weekdays, goals, 0), index=index)
+
+def vectorized_calendar(df, start_date, end_date):
+    # The previous vectorized version: calendar_grid helpers over a full area × day calendar
+    all_areas = sorted(df['AREA'].unique().tolist())
+    calendar = area_day_index(all_areas, start_date, end_date, 'CREATED_AT')
+    goals = weekday_goals(calendar, df.groupby('AREA')['GOALS'].first().to_dict())
+    counts = daily_counts(df, 'AREA', 'CREATED_AT', 'ID', calendar)
+    return pd.DataFrame({'ID': area_totals(counts), 'GOALS': area_totals(goals)})
+
+def cube_totals(cube, start_date, end_date):
+    return pd.DataFrame(
+        {'ID': cube.counts(start_date, end_date), 'GOALS': cube.goals(start_date, end_date)},
+        index=cube.areas
+    )
+
+def best_of(func, *args, repeat=5):
+    return min(timeit.repeat(lambda: func(*args), number=1, repeat=repeat))
+
+def main():
+    end_date = date(2024, 12, 31)
+    print(
+        f"{'days':>5} {'rows':>8} {'legacy ms':>10} {'vectorized ms':>14} {'speedup':>8} "
+        f"{'cube build ms':>14} {'cube lookup ms':>15}"
+    )
+    for days in DAY_COUNTS:
+        start_date = end_date - timedelta(days=days - 1)
+        df = synthetic_appointments(start_date, end_date)
+
+        legacy = legacy_calendar(df, start_date, end_date)
+        vectorized = vectorized_calendar(df, start_date, end_date)
+        cube = DailyCube(df, 'AREA', 'CREATED_AT', 'ID', 'GOALS')
+        pd.testing.assert_frame_equal(
+            legacy.sort_index().astype(int), vectorized.sort_index().astype(int), check_names=False
+        )
+        pd.testing.assert_frame_equal(
+            vectorized.sort_index().astype(int), cube_totals(cube, start_date, end_date).astype(int),
+            check_names=False
+        )
+
+        legacy_time = best_of(legacy_calendar, df, start_date, end_date)
+        vectorized_time = best_of(vectorized_calendar, df, start_date, end_date)
+        build_time = best_of(DailyCube, df, 'AREA', 'CREATED_AT', 'ID', 'GOALS')
+        lookup_time = best_of(cube_totals, cube, start_date, end_date)
+        print(
+            f"{days:>5} {len(df):>8} {legacy_time * 1000:>10.1f} "
+            f"{vectorized_time * 1000:>14.1f} {legacy_time / vectorized_time:>7.1f}x "
+            f"{build_time * 1000:>14.1f} {lookup_time * 1000:>15.3f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Compare building progress-bar card HTML one card at a time (card_html, sales_target_html,
+# gold_standard_html in a list comprehension, as the pages used to) with the vectorized
+# cards_html / sales_targets_html, and check both produce the same HTML. Run from the repo root:
+#
+#   python benchmarks/bench_cards.py
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.progress_bar import (
+    card_html, gold_standard_html, sales_target_html, cards_html, sales_targets_html, GOLD_COLOR,
+)
+
+CARD_COUNTS = [50, 500, 5000]
+
+def synthetic_cards(n, seed=0):
+    # Goals/targets include zeros to cover the division-by-zero branches
+    rng = np.random.default_rng(seed)
+    minimum_target = rng.integers(0, 40, n)
+    return pd.DataFrame({
+        "NAME": [f"Rep {i}" for i in range(n)],
+        "PICTURE_LINK": [f"https://example.com/{i}.png" for i in range(n)],
+        "GOAL": rng.integers(0, 30, n),
+        "ACTUAL": rng.integers(0, 40, n),
+        "PACE": rng.integers(0, 60, n),
+        "MIN_GOAL": minimum_target,
+        "MAX_GOAL": minimum_target + rng.integers(0, 20, n),
+    })
+
+def per_row(df):
+    cards = [
+        card_html(goal, actual, image, name)
+        for goal, actual, image, name in zip(df["GOAL"], df["ACTUAL"], df["PICTURE_LINK"], df["NAME"])
+    ]
+    golds = [
+        gold_standard_html(goal, actual, image, name)
+        for goal, actual, image, name in zip(df["GOAL"], df["ACTUAL"], df["PICTURE_LINK"], df["NAME"])
+    ]
+    targets = [
+        sales_target_html(actual, pace, minimum_target, maximum_target, image, area)
+        for actual, pace, minimum_target, maximum_target, image, area in zip(
+            df["ACTUAL"], df["PACE"], df["MIN_GOAL"], df["MAX_GOAL"], df["PICTURE_LINK"], df["NAME"]
+        )
+    ]
+    return cards, golds, targets
+
+def vectorized(df):
+    cards = cards_html(df["GOAL"], df["ACTUAL"], df["PICTURE_LINK"], df["NAME"])
+    golds = cards_html(df["GOAL"], df["ACTUAL"], df["PICTURE_LINK"], df["NAME"], met_color=GOLD_COLOR, star=True)
+    targets = sales_targets_html(df["ACTUAL"], df["PACE"], df["MIN_GOAL"], df["MAX_GOAL"], df["PICTURE_LINK"], df["NAME"])
+    return cards, golds, targets
+
+def best_of(func, *args, repeat=7):
+    return min(timeit.repeat(lambda: func(*args), number=1, repeat=repeat))
+
+def main():
+    print(f"{'cards':>6} {'per row':>10} {'vectorized':>11} {'speedup':>8}   (ms for cards + gold standards + sales targets)")
+    for n in CARD_COUNTS:
+        df = synthetic_cards(n)
+        assert per_row(df) == vectorized(df)
+
+        row_time = best_of(per_row, df) * 1000
+        vector_time = best_of(vectorized, df) * 1000
+        print(f"{n:>6} {row_time:>10.2f} {vector_time:>11.2f} {row_time / vector_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""End-to-end timings of the transformation layer against the offline Snowflake stand-in
+(fake_snowflake.py) at several data sizes: the cold load of each cached query (Arrow -> pandas,
+caching and snapshots; the stand-in's own time is subtracted), process_appointments_data,
+process_sales_data, the Leaderboards grouping (local and, when installed, DuckDB engines) and the
+card renderers. Needs no credentials or network. Run from the repo root:
+
+  python benchmarks/bench_pipeline.py
+  python benchmarks/bench_pipeline.py --json timings.json                 # save the results
+  python benchmarks/bench_pipeline.py --baseline timings.json --tolerance 1.5
+
+With --baseline the run exits non-zero when any stage is more than `tolerance` times slower
+than the saved timing, so a regression shows up before deploy.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import timeit
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Snapshots and thumbnails go to a scratch directory, never the app's .cache
+_scratch = tempfile.mkdtemp(prefix="bench-pipeline-")
+os.environ["SNAPSHOT_CACHE_DIR"] = os.path.join(_scratch, "snapshots")
+os.environ["IMAGE_CACHE_DIR"] = os.path.join(_scratch, "images")
+
+import streamlit.logger
+
+streamlit.logger.set_log_level("error")  # bare mode warns about the missing script context
+
+from fake_snowflake import SyntheticWarehouse, use_fake_snowflake
+from features.progress_bar import cards_html, sales_targets_html, GOLD_COLOR
+from transformation import appointments_data, sales_data, leaderboard, contract_value_leaderboard, dimensions
+from transformation import gold_standard, leaderboard_aggregation
+from transformation.leaderboard_aggregation import aggregate_leaderboard, history_window
+from transformation.perf import PERF_LOG
+from transformation.duckdb_engine import duckdb_available
+
+# (label, areas, reps, days)
+SIZES = [
+    ("small", 5, 50, 90),
+    ("medium", 17, 400, 395),
+    ("large", 17, 2000, 395),
+]
+
+# Every snapshot-cached query function, cleared between sizes
+SNAPSHOT_CACHED = [
+    leaderboard.leaderboard_areas_frame, leaderboard.leaderboard_facts,
+    leaderboard_aggregation.leaderboard_totals, sales_data.get_sales_pace, gold_standard.gs_query,
+    dimensions.rep_dimension, dimensions.area_dimension,
+]
+# st.cache_resource factories of the incremental caches, and the memoized transforms
+RESOURCE_CACHED = [appointments_data.appointments_cache, sales_data.sales_cache, contract_value_leaderboard.cv_cache]
+DERIVED_CACHED = [
+    appointments_data.appointments_cube, appointments_data.process_appointments_data,
+    sales_data.sales_summary, leaderboard.leaderboard_query, leaderboard.fm_leaderboard_query,
+    leaderboard_aggregation.board_index, leaderboard_aggregation.board_database,
+]
+
+def reset_caches():
+    for cached in SNAPSHOT_CACHED + DERIVED_CACHED:
+        cached.clear()
+    for factory in RESOURCE_CACHED:
+        factory.clear()
+    # Persisted snapshots too, so every size starts cold
+    for path in glob.glob(os.path.join(os.environ["SNAPSHOT_CACHE_DIR"], "*.parquet")):
+        os.remove(path)
+
+def once(func):
+    start = timeit.default_timer()
+    func()
+    return timeit.default_timer() - start
+
+def app_side(func):
+    # Wall time of a cold load minus the stand-in's own time building query results
+    # (the snowflake.query stage), i.e. what the app spends converting and caching them
+    PERF_LOG.clear()
+    elapsed = once(func)
+    return elapsed - sum(sample["seconds"] for sample in PERF_LOG.samples() if sample["stage"] == "snowflake.query")
+
+def best_of(func, repeat=5):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+def uncached(derived, *args):
+    # The memoized transform recomputed from already-cached query results
+    def run():
+        derived.clear()
+        return derived(*args)
+    return run
+
+def leaderboard_grouping(start_date, end_date):
+    # What one Leaderboards rerun computes: the activity and CV boards for every role/dimension
+    def run():
+        for role in ("Energy Consultant", "Field Marketer"):
+            for dimension in ("Rep", "Area"):
+                aggregate_leaderboard(role, role, dimension, start_date, end_date, (),
+                                      top_n=leaderboard_aggregation.LEADERBOARD_TOP_N)
+                aggregate_leaderboard("Contract Value", role, dimension, start_date, end_date, (),
+                                      top_n=leaderboard_aggregation.LEADERBOARD_TOP_N)
+    return run
+
+def run_size(areas, reps, days):
+    warehouse = SyntheticWarehouse(areas=areas, reps=reps, days=days)
+    use_fake_snowflake(warehouse)
+    reset_caches()
+
+    today = warehouse.today
+    week = (today - timedelta(days=6), today)
+    month_start = today.replace(day=1)
+    history_start, history_end = history_window()
+    timings = {}
+
+    # Cold loads: Arrow -> pandas, caching and snapshotting of each query's result
+    timings["fetch appointments"] = app_side(appointments_data.get_appointments)
+    timings["fetch sales + pace"] = app_side(lambda: (sales_data.get_sales(today.month, today.year), sales_data.get_sales_pace()))
+    timings["fetch leaderboard facts"] = app_side(lambda: (
+        leaderboard.leaderboard_facts(history_start, history_end, ()),
+        contract_value_leaderboard.cv_query(history_start, history_end, ()),
+    ))
+    timings["fetch gold standard"] = app_side(gold_standard.gs_query)
+
+    # Transforms over the cached results
+    timings["process_appointments_data"] = best_of(uncached(appointments_data.process_appointments_data, week))
+    timings["process_appointments_data (cube rebuild)"] = best_of(lambda: (
+        appointments_data.appointments_cube.clear(), uncached(appointments_data.process_appointments_data, week)()
+    ))
+    timings["process_sales_data"] = best_of(uncached(sales_data.sales_summary, today.month, today.year))
+
+    # Leaderboards: the first rerun builds the prefix-sum indexes, later ones only look them up
+    grouping = leaderboard_grouping(month_start, today)
+    timings["leaderboards (index build)"] = best_of(lambda: (leaderboard_aggregation.board_index.clear(), grouping()), repeat=3)
+    timings["leaderboards (rerun)"] = best_of(grouping)
+    if duckdb_available():
+        # The same reruns as SQL over the facts loaded into DuckDB
+        engine, leaderboard_aggregation.LEADERBOARD_ENGINE = leaderboard_aggregation.LEADERBOARD_ENGINE, "duckdb"
+        timings["leaderboards duckdb (load)"] = best_of(lambda: (leaderboard_aggregation.board_database.clear(), grouping()), repeat=3)
+        timings["leaderboards duckdb (rerun)"] = best_of(grouping)
+        leaderboard_aggregation.LEADERBOARD_ENGINE = engine
+
+    # Card renderers (HTML only; st.html is not called)
+    appointments = appointments_data.process_appointments_data(week)
+    sales = sales_data.sales_summary(today.month, today.year)
+    gs = gold_standard.gs_query()
+    timings["cards: sets"] = best_of(lambda: cards_html(appointments["GOALS"], appointments["ID"], appointments["PROFILE_PICTURE"], appointments["AREA"]))
+    timings["cards: sales targets"] = best_of(lambda: sales_targets_html(sales["ID"], sales["PACE"], sales["MIN_GOAL"], sales["MAX_GOAL"], sales["PROFILE_PICTURE"], sales["AREA"]))
+    timings["cards: gold standard"] = best_of(lambda: cards_html(gs["GOAL"], gs["CURRENT_MONTH_SALES_AND_ASSISTS"], gs["PICTURE_LINK"], gs["NAME"], met_color=GOLD_COLOR, star=True))
+
+    facts = len(warehouse.events) + len(warehouse.opportunities)
+    return facts, {stage: seconds * 1000 for stage, seconds in timings.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", help="write the timings (ms) to this file")
+    parser.add_argument("--baseline", help="compare against timings saved with --json")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown vs the baseline")
+    parser.add_argument("--sizes", nargs="*", default=[label for label, *_ in SIZES], help="subset of sizes to run")
+    args = parser.parse_args()
+
+    results = {}
+    for label, areas, reps, days in SIZES:
+        if label not in args.sizes:
+            continue
+        facts, timings = run_size(areas, reps, days)
+        results[label] = timings
+        print(f"\n{label}: {areas} areas, {reps} reps, {days} days ({facts:,} source rows)")
+        for stage, ms in timings.items():
+            print(f"  {stage:<45} {ms:>10.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = [
+            (label, stage, baseline[label][stage], ms)
+            for label, timings in results.items()
+            for stage, ms in timings.items()
+            if stage in baseline.get(label, {}) and ms > baseline[label][stage] * args.tolerance
+        ]
+        for label, stage, before, after in regressions:
+            print(f"REGRESSION {label} / {stage}: {before:.2f} ms -> {after:.2f} ms")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Per-rerun cost of reading a cached frame: st.cache_data (pickle round trip), the deep
+# .copy() the snapshot/incremental caches used to return, and shared_frame (a copy-on-write
+# view). The "+ new column" rows add a column to the result, as the pages do, to show that
+# copy-on-write only copies what a caller touches. Run from the repo root:
+#
+#   python benchmarks/bench_shared_frames.py
+import os
+import pickle
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transformation.snapshot_cache import shared_frame
+
+ROW_COUNTS = [10_000, 100_000, 1_000_000]
+AREAS = [f"Area {i}" for i in range(17)]
+REPS = [f"Rep {i}" for i in range(400)]
+
+def synthetic_facts(rows, seed=0):
+    # Shaped like the cached contract value facts: a date, keys/names, counts and a float
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Sale Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+        "Closer": pd.Categorical(rng.choice(REPS, rows)),
+        "Area": pd.Categorical(rng.choice(AREAS, rows)),
+        "Solar": rng.integers(0, 3, rows).astype(np.int16),
+        "Roofs": rng.integers(0, 3, rows).astype(np.int16),
+        "CV": rng.random(rows) * 50_000,
+    })
+
+def pickled(frame):
+    return pickle.loads(pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL))
+
+def deep_copy(frame):
+    return frame.copy()
+
+def with_new_column(read):
+    def run(frame):
+        df = read(frame)
+        df["CV Rounded"] = df["CV"].round(0)
+        return df
+    return run
+
+def best_of(func, *args, repeat=7):
+    return min(timeit.repeat(lambda: func(*args), number=1, repeat=repeat))
+
+def main():
+    readers = [
+        ("cache_data (pickle)", pickled),
+        ("deep copy", deep_copy),
+        ("shared_frame", shared_frame),
+        ("deep copy + new column", with_new_column(deep_copy)),
+        ("shared_frame + new column", with_new_column(shared_frame)),
+    ]
+    print(f"{'rows':>9} " + " ".join(f"{name:>26}" for name, _ in readers) + "   (ms per rerun)")
+    for rows in ROW_COUNTS:
+        frame = synthetic_facts(rows)
+
+        # The cached frame must be untouched after a reader modified its view
+        view = with_new_column(shared_frame)(frame)
+        assert "CV Rounded" in view and "CV Rounded" not in frame
+
+        timings = [best_of(read, frame) * 1000 for _, read in readers]
+        print(f"{rows:>9} " + " ".join(f"{timing:>26.3f}" for timing in timings))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+# Offline stand-in for Snowflake, for the benchmarks. A SyntheticWarehouse holds generated source
+# rows (leaderboard events, opportunities, area goals, team members) scaled by areas, reps and
+# days; FakeSession.sql() recognises each query the app sends and returns an Arrow table shaped
+# like Snowflake's result for it (upper-case unquoted columns, integer HASH keys, DATE columns as
+# dates). The SQL itself is never executed, so only the app's side of a query is measured.
+#
+#   warehouse = SyntheticWarehouse(areas=17, reps=400, days=395)
+#   use_fake_snowflake(warehouse)   # every run_query() now reads the warehouse
+import hashlib
+import re
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import transformation.snowflake_session as snowflake_session
+
+# The areas the Sets/Sales queries filter on; warehouses use the first N
+AREAS = [
+    'Salem', 'North Portland', 'Des Moines', 'Minneapolis', 'Portland',
+    'Pasco', 'Medford', 'Bozeman', 'Cincinnati', 'Helena',
+    'Cedar Rapids', 'Missoula', 'Puget Sound', 'Spokane', 'Bend',
+    'Billings', 'Utah',
+]
+
+LEADERBOARD_METRICS = ['Sales', 'Sits', 'Opportunities', 'Sets']
+PROJECT_CATEGORIES = ['Solar', 'Battery', 'Roof', 'Reroof - Full', 'Solar + Battery', 'Solar + Roof']
+
+def hash_key(names):
+    # Stand-in for Snowflake's HASH(): a stable signed 64-bit key per name, NULL for NULL
+    codes, uniques = pd.factorize(pd.Series(names, dtype=object))
+    keys = np.array(
+        [int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big", signed=True) for name in uniques],
+        dtype=np.int64,
+    )
+    return pd.arrays.IntegerArray(keys[codes] if len(keys) else np.zeros(len(codes), dtype=np.int64), codes < 0)
+
+class SyntheticWarehouse:
+    def __init__(self, areas=17, reps=400, days=395, events_per_rep_day=0.6, seed=0, today=None):
+        rng = np.random.default_rng(seed)
+        self.today = today or date.today()
+        self.areas = AREAS[:areas]
+        self.closers = [f"Closer {i}" for i in range(max(reps // 2, 1))]
+        self.field_marketers = [f"Field Marketer {i}" for i in range(max(reps - reps // 2, 1))]
+        first_day = np.datetime64(self.today - timedelta(days=days - 1))
+
+        # dtbl_sales_leaderboard: one row per (event id, metric)
+        n = max(int(reps * days * events_per_rep_day), 1)
+        lead_generators = rng.choice(np.array(self.field_marketers, dtype=object), n)
+        lead_generators[rng.random(n) < 0.1] = None
+        self.events = pd.DataFrame({
+            "date": first_day + rng.integers(0, days, n).astype("timedelta64[D]"),
+            "closer": rng.choice(np.array(self.closers, dtype=object), n),
+            "lead_generator": lead_generators,
+            "area": rng.choice(np.array(self.areas, dtype=object), n),
+            "metric": rng.choice(LEADERBOARD_METRICS, n),
+            "id": np.arange(n),
+        })
+
+        # tbl_master_opportunities: half of them sold a few days after being created
+        n = max(int(reps * days * events_per_rep_day / 2), 1)
+        created_at = (first_day + rng.integers(0, days, n).astype("timedelta64[D]")).astype("datetime64[s]")
+        created_at = created_at + rng.integers(8 * 3600, 20 * 3600, n).astype("timedelta64[s]")
+        sale_date = created_at.astype("datetime64[D]") + rng.integers(0, 10, n).astype("timedelta64[D]")
+        sale_date = np.where(rng.random(n) < 0.5, sale_date, np.datetime64("NaT"))
+        area = rng.choice(np.array(self.areas, dtype=object), n)
+        grand_total = rng.random(n) * 60_000
+        self.opportunities = pd.DataFrame({
+            "id": np.arange(n),
+            "created_at": created_at,
+            "sale_date": sale_date.astype("datetime64[D]"),
+            "closer": rng.choice(np.array(self.closers, dtype=object), n),
+            "lead_generator": rng.choice(np.array(self.field_marketers, dtype=object), n),
+            "area": area,
+            "fm_area": area,
+            "project_sub_category": rng.choice(PROJECT_CATEGORIES, n),
+            "grand_total": np.where(rng.random(n) < 0.05, 0.0, grand_total),
+            "lender_fee_total": grand_total * 0.05,
+        })
+
+        # vw_area_goals and tbl_team_members
+        self.area_goals = pd.DataFrame({
+            "area": self.areas,
+            "sets": rng.integers(3, 10, len(self.areas)),
+            "min_goal": rng.integers(10, 30, len(self.areas)),
+        })
+        self.area_goals["max_goal"] = self.area_goals["min_goal"] + rng.integers(5, 20, len(self.areas))
+        self.team_members = pd.DataFrame({
+            "name": self.closers + self.field_marketers,
+            "current": rng.integers(0, 12, len(self.closers) + len(self.field_marketers)),
+            "previous": rng.integers(0, 12, len(self.closers) + len(self.field_marketers)),
+        })
+
+    ###########################################################################
+    # One builder per query shape: (marker in the SQL, builder(params) -> DataFrame)
+    ###########################################################################
+    def _areas_param(self, params, fixed=2):
+        # Area names bound by in_clause() after the `fixed` leading parameters
+        return [p for p in params[fixed:] if isinstance(p, str)]
+
+    def appointments(self, params, sql):
+        df = self.opportunities
+        df = df[(df["created_at"] >= pd.Timestamp(params[0])) & df["lead_generator"].notna()]
+        if len(params) > 1:
+            df = df[df["created_at"] >= pd.Timestamp(params[1])]
+        df = df.merge(self.area_goals[["area", "sets"]], on="area", how="left")
+        return pd.DataFrame({
+            "CREATED_AT": df["created_at"],
+            "ID": df["id"],
+            "AREA": df["area"],
+            "GOALS": df["sets"],
+            "PROFILE_PICTURE": pd.Series([None] * len(df), dtype=object),
+        })
+
+    def _sold_between(self, params):
+        start, end = pd.Timestamp(params[0]), pd.Timestamp(params[1])
+        df = self.opportunities
+        return df[(df["sale_date"] >= start) & (df["sale_date"] <= end)]
+
+    def sales(self, params, sql):
+        df = self._sold_between(params)
+        df = df[df["grand_total"] > 0]
+        if len(params) > 2:
+            df = df[df["sale_date"] >= pd.Timestamp(params[2])]
+        return pd.DataFrame({"SALE_DATE": df["sale_date"].dt.date, "ID": df["id"], "AREA": df["area"]})
+
+    def sales_pace(self, params, sql):
+        today = pd.Timestamp(self.today)
+        df = self.opportunities
+        df = df[(df["sale_date"] >= today - pd.DateOffset(months=6)) & (df["grand_total"] > 0)]
+        last_30 = (df["sale_date"] >= today - pd.Timedelta(days=30)).groupby(df["area"]).sum()
+        this_month = ((df["sale_date"].dt.year == today.year) & (df["sale_date"].dt.month == today.month)).groupby(df["area"]).sum()
+        pace = self.area_goals.set_index("area").reindex(last_30.index)
+        percent_left = 1 - round(today.day / today.days_in_month, 2)
+        return pd.DataFrame({
+            "AREA": last_30.index,
+            "MIN_GOAL": pace["min_goal"].to_numpy(),
+            "MAX_GOAL": pace["max_goal"].to_numpy(),
+            "LAST_30_DAY_SALES": last_30.to_numpy(),
+            "CURRENT_MONTH_SALES": this_month.reindex(last_30.index).to_numpy(),
+            "PACE": np.floor(last_30.to_numpy() * percent_left + this_month.reindex(last_30.index).to_numpy()),
+        })
+
+    def contract_value(self, params, sql):
+        df = self._sold_between(params)
+        areas = self._areas_param(params)
+        if areas:
+            df = df[df["area"].isin(areas)]
+        if "sale_date >= ?" in sql:
+            df = df[df["sale_date"] >= pd.Timestamp(params[-1])]
+        category = df["project_sub_category"]
+        return pd.DataFrame({
+            "ID": df["id"],
+            "Sale Date": df["sale_date"].dt.date,
+            "Closer Key": hash_key(df["closer"]),
+            "Field Marketer Key": hash_key(df["lead_generator"]),
+            "Area Key": hash_key(df["area"]),
+            "Solar": (category == "Solar").astype("int64"),
+            "Batteries": (category == "Battery").astype("int64"),
+            "Roofs": ((category == "Roof") | category.str.startswith("Reroof")).astype("int64"),
+            "Bundled": category.str.startswith("Solar +").astype("int64"),
+            "CV": df["grand_total"] - df["lender_fee_total"],
+        })
+
+    def _leaderboard_facts(self, params, rep_col, key_name, metric_names):
+        start, end = pd.Timestamp(params[0]), pd.Timestamp(params[1])
+        df = self.events
+        df = df[(df["date"] >= start) & (df["date"] <= end)]
+        areas = self._areas_param(params)
+        if areas:
+            df = df[df["area"].isin(areas)]
+        if rep_col == "lead_generator":
+            df = df[df["lead_generator"].notna()]
+        counts = (
+            df.groupby(["date", rep_col, "area", "metric"], dropna=False).size()
+            .unstack("metric").reindex(columns=list(metric_names), fill_value=0).fillna(0).astype("int64")
+            .reset_index()
+        )
+        facts = pd.DataFrame({
+            "Date": counts["date"].dt.date,
+            key_name: hash_key(counts[rep_col]),
+            "Area Key": hash_key(counts["area"]),
+        })
+        for metric, column in metric_names.items():
+            facts[column] = counts[metric].to_numpy()
+        return facts
+
+    def leaderboard(self, params, sql):
+        return self._leaderboard_facts(params, "closer", "Closer Key",
+                                       {"Sales": "Sales", "Sits": "Sits", "Opportunities": "Opps"})
+
+    def fm_leaderboard(self, params, sql):
+        return self._leaderboard_facts(params, "lead_generator", "FM Key",
+                                       {"Sales": "Assists", "Sits": "Sits", "Sets": "Sets"})
+
+    def leaderboard_facts(self, params, sql):
+        # The GROUPING SETS scan: closer rows (Grouping 1) then lead generator rows (Grouping 2)
+        metrics = {"Sales": "Sales", "Sits": "Sits", "Opportunities": "Opps", "Sets": "Sets"}
+        closers = self._leaderboard_facts(params, "closer", "Closer Key", metrics)
+        closers.insert(2, "FM Key", pd.array([pd.NA] * len(closers), dtype=closers["Closer Key"].dtype))
+        closers.insert(4, "Grouping", 1)
+        marketers = self._leaderboard_facts(params, "lead_generator", "FM Key", metrics)
+        marketers.insert(1, "Closer Key", pd.array([pd.NA] * len(marketers), dtype=marketers["FM Key"].dtype))
+        marketers.insert(4, "Grouping", 2)
+        return pd.concat([closers, marketers], ignore_index=True)
+
+    def leaderboard_areas(self, params, sql):
+        return pd.DataFrame({"Area": sorted(self.events["area"].unique())})
+
+    def rep_dimension(self, params, sql):
+        names = self.closers + self.field_marketers
+        return pd.DataFrame({
+            "Key": hash_key(names),
+            "Name": names,
+            "Closer Picture Link": [f"https://example.com/reps/{i}.png" for i in range(len(names))],
+            "FM Picture Link": [f"https://example.com/reps/fm-{i}.png" for i in range(len(names))],
+        })
+
+    def area_dimension(self, params, sql):
+        return pd.DataFrame({
+            "Key": hash_key(self.areas),
+            "Name": self.areas,
+            "Picture Link": [f"https://example.com/areas/{i}.png" for i in range(len(self.areas))],
+        })
+
+    def gold_standard(self, params, sql):
+        members = self.team_members
+        return pd.DataFrame({
+            "CURRENT_MONTH_SALES_AND_ASSISTS": members["current"],
+            "PREVIOUS_MONTH_SALES_AND_ASSISTS": members["previous"],
+            "NAME": members["name"],
+            "DATE": [self.today] * len(members),
+            "PICTURE_LINK": [f"https://example.com/reps/{i}.png" for i in range(len(members))],
+            "GOAL": 8,
+        })
+
+    def aggregation(self, params, sql):
+        # leaderboard_totals: the facts query it wraps, grouped by the key column in pandas
+        match = re.fullmatch(
+            r'WITH facts AS \((.*)\) SELECT "([^"]+)", (.*?) FROM facts WHERE .*? GROUP BY "[^"]+" (.*)', sql
+        )
+        if match is None:
+            raise NotImplementedError(f"Unrecognised aggregation query: {sql[:120]}")
+        facts_sql, key_col, metric_sums, tail = match.groups()
+        metrics = re.findall(r'SUM\("([^"]+)"\)', metric_sums)
+        facts = self.result(facts_sql, params)
+        totals = facts[facts[key_col].notna()].groupby(key_col)[metrics].sum().reset_index()
+
+        # QUALIFY RANK() OVER (ORDER BY SUM(first metric) DESC) <= limit keeps the rows tied at the limit
+        limit = re.search(r"QUALIFY RANK\(\) OVER .*? <= (\d+)", tail)
+        if limit:
+            totals = totals[totals[metrics[0]].rank(method="min", ascending=False) <= int(limit.group(1))]
+        return totals.sort_values([metrics[0], key_col], ascending=[False, True]).reset_index(drop=True)
+
+    def result(self, sql, params):
+        # Markers are matched on the query with whitespace collapsed, most specific first
+        # (the aggregation wraps a facts query; the CV query also mentions "Closer Key")
+        normalized = " ".join(sql.split())
+        for marker, builder in (
+            ('WITH facts AS (', self.aggregation),
+            ('GROUPING SETS', self.leaderboard_facts),
+            ('"Field Marketer Key"', self.contract_value),
+            ('"FM Key"', self.fm_leaderboard),
+            ('"Closer Key"', self.leaderboard),
+            ('sets AS GOALS', self.appointments),
+            ('percent_of_month_left', self.sales_pace),
+            ('SELECT sale_date, id, tbl_master_opportunities.area FROM', self.sales),
+            ('SELECT DISTINCT area "Area"', self.leaderboard_areas),
+            ('rep_name', self.rep_dimension),
+            ('area "Name"', self.area_dimension),
+            ('tbl_team_members', self.gold_standard),
+        ):
+            if marker in normalized:
+                return builder(list(params or []), normalized)
+        raise NotImplementedError(f"No synthetic result for query: {normalized[:120]}")
+
+class FakeResult:
+    def __init__(self, warehouse, sql, params):
+        self._warehouse = warehouse
+        self._sql = sql
+        self._params = params
+
+    def to_arrow(self):
+        if re.fullmatch(r"\s*SELECT 1\s*", self._sql):
+            return pa.table({"1": [1]})
+        return pa.Table.from_pandas(self._warehouse.result(self._sql, self._params), preserve_index=False)
+
+    def collect(self):
+        return self.to_arrow().to_pylist()
+
+class FakeSession:
+    def __init__(self, warehouse):
+        self._warehouse = warehouse
+
+    def sql(self, query, params=None):
+        return FakeResult(self._warehouse, query, params)
+
+    def close(self):
+        pass
+
+def use_fake_snowflake(warehouse):
+    # Route run_query() (and everything built on it) to the warehouse, with a fresh pool
+    pool = snowflake_session.SessionPool(lambda: FakeSession(warehouse))
+    snowflake_session.get_session_pool = lambda: pool
+    return pool
@@ -0,0 +1,31 @@
+import streamlit as st
+from transformation.image_cache import thumbnails
+
+# Leaderboard rows are read-only: st.dataframe draws them on a virtualized canvas grid that only
+# paints (and fetches pictures for) the rows on screen, without the editing machinery of
+# st.data_editor.
+ROW_HEIGHT = 35
+MAX_TABLE_HEIGHT = 1000
+
+def table_height(df, row_height=ROW_HEIGHT):
+    # Fit the table to its rows plus the header, up to MAX_TABLE_HEIGHT (scrolls past that)
+    return min(MAX_TABLE_HEIGHT, row_height * (len(df) + 1) + 3)
+
+def leaderboard_table(df, picture_col, name_col, metrics):
+    # Picture, name, then the metrics in board order; columns missing from df are skipped
+    column_order = [col for col in (picture_col, name_col, *metrics) if col in df.columns]
+    column_config = {name_col: st.column_config.TextColumn(name_col)}
+    if picture_col in df.columns:
+        # Shrunk to the row height and sent inline rather than hotlinked per row
+        df = df.assign(**{picture_col: thumbnails(df[picture_col], ROW_HEIGHT)})
+        column_config[picture_col] = st.column_config.ImageColumn("")
+
+    st.dataframe(
+        df,
+        column_config=column_config,
+        column_order=column_order,
+        hide_index=True,
+        height=table_height(df),
+        row_height=ROW_HEIGHT,
+        width="stretch",
+    )
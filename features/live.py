@@ -0,0 +1,24 @@
+import os
+from datetime import datetime
+import streamlit as st
+
+# Live mode for the wall displays: the card grid is a fragment that reruns itself every
+# LIVE_INTERVAL seconds instead of the whole page. A fragment run only reads the caches the
+# prefetcher (one poller per process) keeps fresh and re-renders the grid, so N open displays
+# cost N cache reads, not N full reruns or N rounds of queries. The transforms behind the grids
+# are memoized on the cache versions. Every card is its own element, and Streamlit sends one whose
+# HTML didn't change as a reference to the browser's copy, so a run only ships the changed cards.
+# 0 turns live mode off.
+LIVE_INTERVAL = float(os.environ.get("LIVE_INTERVAL", "30"))
+
+def live_fragment(render):
+    # Decorator: render as a self-refreshing fragment (a plain function when live mode is off)
+    if LIVE_INTERVAL <= 0:
+        return render
+    return st.fragment(run_every=LIVE_INTERVAL)(render)
+
+def rerun_on_new_day(day, tz):
+    # Defaults like "today" or "this month" were computed by the last full run;
+    # a display left on overnight reruns the page once to move them forward.
+    if datetime.now(tz).date() != day:
+        st.rerun()
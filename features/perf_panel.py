@@ -0,0 +1,38 @@
+import streamlit as st
+from transformation.perf import PERF_LOG
+from transformation.snowflake_session import session_pool_stats
+from transformation.image_cache import get_image_cache
+from transformation.prefetch import start_prefetcher
+
+# Hidden admin panel: add ?perf=1 to any page's URL to see where this process spends its time
+PERF_QUERY_PARAM = "perf"
+
+def perf_panel():
+    # Call last on a page so the current run's stages are included
+    if st.query_params.get(PERF_QUERY_PARAM) != "1":
+        return
+
+    with st.sidebar.expander("Performance", expanded=True):
+        st.dataframe(
+            PERF_LOG.summary(),
+            hide_index=True,
+            column_config={
+                "p50 ms": st.column_config.NumberColumn(format="%.1f"),
+                "p95 ms": st.column_config.NumberColumn(format="%.1f"),
+                "Max ms": st.column_config.NumberColumn(format="%.1f"),
+                "Rows": st.column_config.NumberColumn(format="%.0f"),
+                "KB": st.column_config.NumberColumn(format="%.1f"),
+                "Hit rate": st.column_config.NumberColumn(format="percent"),
+            },
+        )
+        st.json({
+            "session pool": session_pool_stats(),
+            "prefetcher": start_prefetcher().stats(),
+            "images": get_image_cache().stats(),
+        }, expanded=False)
+        st.download_button(
+            "Export samples (JSON)",
+            PERF_LOG.to_json(),
+            file_name="perf_samples.json",
+            mime="application/json",
+        )
@@ -1,14 +1,119 @@
+import string
+import numpy as np
 import streamlit as st
 from datetime import datetime
 from calendar import monthrange
+from transformation.image_cache import thumbnail, thumbnails
+from transformation.perf import instrumented
 
-def create_card(area, goal, actual, profile_image, name):
-    # Calculate the percentage to goal, handling division by zero
-    percentage_to_goal = min((actual / goal) * 100 if goal != 0 else 100, 100)
-    # Set the progress bar color based on the percentage
-    progress_color = "#C34547" if percentage_to_goal < 100 else "#32A077"
+# Drawn size (CSS px) of the card pictures; they are shrunk to this before being sent
+PROFILE_PICTURE_SIZE = 45
+AREA_PICTURE_SIZE = 40
+
+# Shared styles for the .card progress cards (Sets and Gold Standard) and the grid header
+CARD_CSS = """
+    .card {
+        background-color: #41434A;
+        padding: 10px;
+        border-radius: 10px;
+        margin-bottom: 5px;
+        color: white;
+        position: relative;
+    }
+    .profile-section {
+        display: flex;
+        align-items: center;
+        margin-bottom: 8px;
+    }
+    .profile-pic {
+        border-radius: 50%;
+        width: 45px;
+        height: 45px;
+        margin-right: 15px;
+    }
+    .name {
+        font-size: 16px;
+        font-weight: bold;
+    }
+    .appointments {
+        font-size: 16px;
+        margin-bottom: 10px;
+        color: white;
+    }
+    .progress-bar {
+        background-color: #37383C;
+        border-radius: 25px;
+        width: 100%;
+        height: 20px;
+        position: relative;
+        margin-bottom: 10px;
+    }
+    .progress-bar-fill {
+        background-color: #C34547;
+        height: 100%;
+        border-radius: 25px;
+    }
+    .goal {
+        position: absolute;
+        right: 5px;
+        top: 50%;
+        transform: translateY(-50%);
+        font-size: 16px;
+        color: white;
+        font-weight: bold;
+    ._container_51w34_1 {
+        display: none !important;
+    }
+    }
+    .card-grid-header {
+        margin-bottom: 1rem;
+    }
+"""
+
+# Shared styles for the sales target cards (previously embedded in every card)
+SALES_TARGET_CSS = """
+    .sales-target {
+        background-color: #41434A;
+        padding: 20px;
+        width: 100%;
+        border-radius: 20px;
+        box-sizing: border-box;
+        color: white;
+        font-family: Arial, Helvetica, sans-serif;
+        position: relative;
+    }
+    .tooltip {
+        position: relative;
+        display: inline-block;
+        cursor: pointer;
+        margin-left: 5px;
+    }
+    .tooltip .tooltiptext {
+        visibility: hidden;
+        width: 220px;
+        background-color: #484A4F;
+        color: #fff;
+        text-align: left;
+        border-radius: 6px;
+        padding: 10px;
+        position: absolute;
+        z-index: 1000;
+        top: 100%; /* Position the tooltip below the icon */
+        right: 0%;
+        margin-top: 10px;
+        opacity: 0;
+        transition: opacity 0.3s;
+    }
+    .tooltip:hover .tooltiptext {
+        visibility: visible;
+        opacity: 1;
+    }
+"""
 
-    st.markdown(f"""
+###############################################################################
+# Card templates, filled by the per-card functions and the vectorized batches
+###############################################################################
+CARD_TEMPLATE = """
         <div class="card">
             <div class="profile-section">
                 <img src="{profile_image}" class="profile-pic" alt="Profile Picture">
@@ -20,77 +125,11 @@ def create_card(area, goal, actual, profile_image, name):
                 <div class="goal">{goal}</div>
             </div>
         </div>
-    """, unsafe_allow_html=True)
-
-
-def sales_target(actual, pace, minimum_target, maximum_target, image, area):
-    # Calculate percentages
-    today = datetime.today()
-    total_days_in_month = monthrange(today.year, today.month)[1]
-    day_of_month = today.day
-
-    percent_through_month = (day_of_month / total_days_in_month) * 100
-    percent_to_minimum = (actual / minimum_target) * 100 if minimum_target > 0 else 100
-    percent_to_maximum = (actual / maximum_target) * 100 if maximum_target > 0 else 100
-
-    # Determine colors and arrows based on comparison with % through month
-    if percent_to_minimum >= percent_through_month:
-        min_color = "#2C966C"  # green
-        min_arrow = "🔼"
-        progress_bar_color = "#2C966C"  # green
-    else:
-        min_color = "#BB3C3E"  # red
-        min_arrow = "🔻"
-        progress_bar_color = "#BB3C3E"  # red
-
-    if percent_to_maximum >= percent_through_month:
-        max_color = "#2C966C"  # green
-        max_arrow = "🔼"
-    else:
-        max_color = "#BB3C3E"  # red
-        max_arrow = "🔻"
-
-    # Progress bar calculations
-    progress_percentage = (actual / maximum_target) * 100 if maximum_target > 0 else 0
-    progress_percentage = min(progress_percentage, 100)  # Cap at 100%
+    """
 
-    # Position of the vertical line (minimum target marker)
-    vertical_line_position = (minimum_target / maximum_target) * 100 if maximum_target > 0 else 0
-    vertical_line_position = min(vertical_line_position, 100)
-
-
-    # Generate the HTML code
-    html_code = f"""
-    <div style="background-color: #41434A; padding: 20px; width: 100%;border-radius: 20px; box-sizing: border-box; color: white; font-family: Arial, Helvetica, sans-serif; position: relative;">
-        <!-- Include custom styles for the tooltip -->
-        <style>
-            .tooltip {{
-                position: relative;
-                display: inline-block;
-                cursor: pointer;
-                margin-left: 5px;
-            }}
-            .tooltip .tooltiptext {{
-                visibility: hidden;
-                width: 220px;
-                background-color: #484A4F;
-                color: #fff;
-                text-align: left;
-                border-radius: 6px;
-                padding: 10px;
-                position: absolute;
-                z-index: 1000;
-                top: 100%; /* Position the tooltip below the icon */
-                right: 0%;
-                margin-top: 10px;
-                opacity: 0;
-                transition: opacity 0.3s;
-            }}
-            .tooltip:hover .tooltiptext {{
-                visibility: visible;
-                opacity: 1;
-            }}
-        </style>
+# Styles live in SALES_TARGET_CSS
+SALES_TARGET_TEMPLATE = """
+    <div class="sales-target">
         <!-- Header starts here -->
         <div style="width: 95%; margin-bottom: 10px; display: flex; justify-content: space-between; align-items: center; position: relative;">
             <div style="display: flex; align-items: center;">
@@ -101,9 +140,9 @@ def sales_target(actual, pace, minimum_target, maximum_target, image, area):
             <div class="tooltip" style="color: #6E7076;">
                 <span style="font-size: 14px; cursor: pointer;">&#9432;</span> <!-- Unicode for info symbol -->
                 <div class="tooltiptext" style="font-size: 14px;">
-                    <p>% through month: {percent_through_month:.0f}%</p>
-                    <p>% to minimum: <span style="color: {min_color};">{percent_to_minimum:.0f}% {min_arrow}</span></p>
-                    <p>% to stretch: <span style="color: {max_color};">{percent_to_maximum:.0f}% {max_arrow}</span></p>
+                    <p>% through month: {percent_through_month}%</p>
+                    <p>% to minimum: <span style="color: {min_color};">{percent_to_minimum}% {min_arrow}</span></p>
+                    <p>% to stretch: <span style="color: {max_color};">{percent_to_maximum}% {max_arrow}</span></p>
                 </div>
             </div>
         </div>
@@ -117,7 +156,7 @@ def sales_target(actual, pace, minimum_target, maximum_target, image, area):
             <!-- Progress bar container -->
             <div style="width: 100%; background: #333; border-radius: 20px; height: 20px; overflow: hidden; position: relative;">
                 <!-- Progress section -->
-                <div style="background: {progress_bar_color}; width: {progress_percentage}%; height: 100%;"></div>
+                <div style="background: {min_color}; width: {progress_percentage}%; height: 100%;"></div>
                 <!-- Vertical line at the minimum target mark -->
                 <div style="position: absolute; left: {vertical_line_position}%; top: 0; height: 100%; width: 2px; background-color: #2C966C;"></div>
             </div>
@@ -134,29 +173,232 @@ def sales_target(actual, pace, minimum_target, maximum_target, image, area):
     </div>
     """
 
-    st.html(html_code)
+BEHIND_COLOR = "#C34547"
+MET_COLOR = "#32A077"
+GOLD_COLOR = "#E1AB3D"
 
-def gold_standard(goal, actual, profile_image, name):
+# Sales targets: green with an up arrow when ahead of the month, red with a down arrow when behind
+AHEAD_COLOR, AHEAD_ARROW = "#2C966C", "🔼"
+BEHIND_TARGET_COLOR, BEHIND_ARROW = "#BB3C3E", "🔻"
+
+def percent_through_month(today=None):
+    today = today or datetime.today()
+    return (today.day / monthrange(today.year, today.month)[1]) * 100
+
+###############################################################################
+# One card at a time
+###############################################################################
+def card_html(goal, actual, profile_image, name):
     # Calculate the percentage to goal, handling division by zero
-    percentage_to_goal = min((actual / goal) * 100 if goal != 0 else 100, 100)
+    percentage_to_goal = min((actual / goal) * 100 if goal != 0 else 100.0, 100.0)
     # Set the progress bar color based on the percentage
-    progress_color = "#C34547" if percentage_to_goal < 100 else "#E1AB3D"
-    
-    # If it's over (or equal to) the goal, add the emoji and a drop shadow
+    progress_color = BEHIND_COLOR if percentage_to_goal < 100 else MET_COLOR
+
+    return CARD_TEMPLATE.format(
+        profile_image=profile_image, name=name, actual=actual, goal=goal,
+        percentage_to_goal=percentage_to_goal, progress_color=progress_color,
+    )
+
+def create_card(area, goal, actual, profile_image, name):
+    profile_image = thumbnail(profile_image, PROFILE_PICTURE_SIZE)
+    render_card_grid([card_html(goal, actual, profile_image, name)], CARD_CSS, num_columns=1)
+
+
+def sales_target_html(actual, pace, minimum_target, maximum_target, image, area):
+    # Calculate percentages
+    month_percent = percent_through_month()
+    percent_to_minimum = (actual / minimum_target) * 100 if minimum_target > 0 else 100
+    percent_to_maximum = (actual / maximum_target) * 100 if maximum_target > 0 else 100
+
+    # Determine colors and arrows based on comparison with % through month
+    # (the progress bar takes the minimum target's color)
+    if percent_to_minimum >= month_percent:
+        min_color, min_arrow = AHEAD_COLOR, AHEAD_ARROW
+    else:
+        min_color, min_arrow = BEHIND_TARGET_COLOR, BEHIND_ARROW
+
+    if percent_to_maximum >= month_percent:
+        max_color, max_arrow = AHEAD_COLOR, AHEAD_ARROW
+    else:
+        max_color, max_arrow = BEHIND_TARGET_COLOR, BEHIND_ARROW
+
+    # Progress bar calculations
+    progress_percentage = (actual / maximum_target) * 100 if maximum_target > 0 else 0.0
+    progress_percentage = min(progress_percentage, 100.0)  # Cap at 100%
+
+    # Position of the vertical line (minimum target marker)
+    vertical_line_position = (minimum_target / maximum_target) * 100 if maximum_target > 0 else 0.0
+    vertical_line_position = min(vertical_line_position, 100.0)
+
+    return SALES_TARGET_TEMPLATE.format(
+        image=image, area=area, actual=actual, pace=pace,
+        minimum_target=minimum_target, maximum_target=maximum_target,
+        percent_through_month=f"{month_percent:.0f}",
+        percent_to_minimum=f"{percent_to_minimum:.0f}", min_color=min_color, min_arrow=min_arrow,
+        percent_to_maximum=f"{percent_to_maximum:.0f}", max_color=max_color, max_arrow=max_arrow,
+        progress_percentage=progress_percentage, vertical_line_position=vertical_line_position,
+    )
+
+def sales_target(actual, pace, minimum_target, maximum_target, image, area):
+    image = thumbnail(image, AREA_PICTURE_SIZE)
+    render_card_grid([sales_target_html(actual, pace, minimum_target, maximum_target, image, area)], SALES_TARGET_CSS, num_columns=1)
+
+def gold_standard_html(goal, actual, profile_image, name):
+    # Calculate the percentage to goal, handling division by zero
+    percentage_to_goal = min((actual / goal) * 100 if goal != 0 else 100.0, 100.0)
+    # Set the progress bar color based on the percentage
+    progress_color = BEHIND_COLOR if percentage_to_goal < 100 else GOLD_COLOR
+
+    # If it's over (or equal to) the goal, add the emoji
     if actual >= goal:
         name = f"{name} ⭐"
-        # Instead of setting a text-shadow on the name, we apply a box-shadow to the card.
 
-    st.markdown(f"""
-    <div class="card">
-        <div class="profile-section">
-            <img src="{profile_image}" class="profile-pic" alt="Profile Picture">
-            <div class="name">{name}</div>
-        </div>
-        <div class="appointments">{actual}</div>
-        <div class="progress-bar">
-            <div class="progress-bar-fill" style="width: {percentage_to_goal}%; background-color: {progress_color};"></div>
-            <div class="goal">{goal}</div>
-        </div>
-    </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+    return CARD_TEMPLATE.format(
+        profile_image=profile_image, name=name, actual=actual, goal=goal,
+        percentage_to_goal=percentage_to_goal, progress_color=progress_color,
+    )
+
+def gold_standard(goal, actual, profile_image, name):
+    profile_image = thumbnail(profile_image, PROFILE_PICTURE_SIZE)
+    render_card_grid([gold_standard_html(goal, actual, profile_image, name)], CARD_CSS, num_columns=1)
+
+###############################################################################
+# Whole frames at once: every number and color is computed column-wise with NumPy,
+# then the cards are joined from a precompiled template and the preformatted strings.
+###############################################################################
+def compile_template(template):
+    # Split a template into its literal text and the field in each gap, so a batch of cards is
+    # assembled by joining pieces instead of parsing the template again for every card.
+    # Returns (literals, fields) with one more literal than fields.
+    literals = []
+    fields = []
+    for literal, field, _, _ in string.Formatter().parse(template):
+        literals.append(literal)
+        if field is not None:
+            fields.append(field)
+    if len(literals) == len(fields):
+        literals.append("")
+    return literals, fields
+
+COMPILED_CARD = compile_template(CARD_TEMPLATE)
+COMPILED_SALES_TARGET = compile_template(SALES_TARGET_TEMPLATE)
+
+def _text(values):
+    # Same text an f-string gives each value
+    return list(map(str, np.asarray(values).tolist()))
+
+def _whole_percent(values):
+    # f"{value:.0f}" for a column
+    return list(map("{:.0f}".format, np.asarray(values, dtype=np.float64).tolist()))
+
+def _ratio_percent(numerator, denominator, use, fallback):
+    # numerator / denominator * 100 where use, else fallback (no division warnings)
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(use, numerator / denominator * 100, fallback)
+
+def _fill(compiled, columns):
+    # One card per row; columns maps each template field to equal-length strings.
+    # Rows of [literal, value, literal, ..., literal] are laid out in one object array and joined.
+    literals, fields = compiled
+    pieces = np.empty((len(columns[fields[0]]), len(literals) + len(fields)), dtype=object)
+    pieces[:, 0::2] = literals
+    for slot, field in enumerate(fields):
+        pieces[:, 2 * slot + 1] = columns[field]
+    return list(map("".join, pieces.tolist()))
+
+@instrumented("cards.cards_html")
+def cards_html(goals, actuals, profile_images, names, met_color=MET_COLOR, star=False):
+    # card_html for whole columns (gold_standard_html with met_color=GOLD_COLOR, star=True)
+    goals = np.asarray(goals)
+    actuals = np.asarray(actuals)
+    percentage = np.minimum(_ratio_percent(actuals, goals, goals != 0, 100.0), 100.0)
+    names = _text(names)
+    if star:
+        names = np.where(actuals >= goals, np.char.add(np.array(names), " ⭐"), names).tolist()
+
+    return _fill(COMPILED_CARD, {
+        "profile_image": _text(profile_images),
+        "name": names,
+        "actual": _text(actuals),
+        "goal": _text(goals),
+        "percentage_to_goal": _text(percentage),
+        "progress_color": np.where(percentage < 100, BEHIND_COLOR, met_color),
+    })
+
+@instrumented("cards.sales_targets_html")
+def sales_targets_html(actuals, paces, minimum_targets, maximum_targets, images, areas, today=None):
+    # sales_target_html for whole columns
+    actuals = np.asarray(actuals)
+    minimum_targets = np.asarray(minimum_targets)
+    maximum_targets = np.asarray(maximum_targets)
+    month_percent = percent_through_month(today)
+
+    percent_to_minimum = _ratio_percent(actuals, minimum_targets, minimum_targets > 0, 100.0)
+    percent_to_maximum = _ratio_percent(actuals, maximum_targets, maximum_targets > 0, 100.0)
+    ahead_of_minimum = percent_to_minimum >= month_percent
+    ahead_of_maximum = percent_to_maximum >= month_percent
+
+    has_maximum = maximum_targets > 0
+    progress = np.minimum(_ratio_percent(actuals, maximum_targets, has_maximum, 0.0), 100.0)
+    marker = np.minimum(_ratio_percent(minimum_targets, maximum_targets, has_maximum, 0.0), 100.0)
+
+    return _fill(COMPILED_SALES_TARGET, {
+        "image": _text(images),
+        "area": _text(areas),
+        "actual": _text(actuals),
+        "pace": _text(paces),
+        "minimum_target": _text(minimum_targets),
+        "maximum_target": _text(maximum_targets),
+        "percent_through_month": [f"{month_percent:.0f}"] * len(actuals),
+        "percent_to_minimum": _whole_percent(percent_to_minimum),
+        "min_color": np.where(ahead_of_minimum, AHEAD_COLOR, BEHIND_TARGET_COLOR),
+        "min_arrow": np.where(ahead_of_minimum, AHEAD_ARROW, BEHIND_ARROW),
+        "percent_to_maximum": _whole_percent(percent_to_maximum),
+        "max_color": np.where(ahead_of_maximum, AHEAD_COLOR, BEHIND_TARGET_COLOR),
+        "max_arrow": np.where(ahead_of_maximum, AHEAD_ARROW, BEHIND_ARROW),
+        "progress_percentage": _text(progress),
+        "vertical_line_position": _text(marker),
+    })
+
+###############################################################################
+# Rendering: the shared CSS once, then one element per card
+###############################################################################
+@instrumented("cards.render")
+def render_card_grid(cards, css, num_columns=3, header=None):
+    # Shared CSS once, then each card as its own element, placed row by row as
+    # columns[idx % num_columns]. A live rerun emits every card again, but Streamlit sends a card
+    # whose HTML hasn't changed as a reference to the copy the browser already has
+    # (global.minCachedMessageSize in .streamlit/config.toml), so only changed cards go out in full.
+    st.html(f"<style>{css}</style>")
+    if header:
+        st.html(f'<div class="card-grid-header">{header}</div>')
+    columns = st.columns(num_columns)
+    for idx, card in enumerate(cards):
+        with columns[idx % num_columns]:
+            st.html(card)
+
+def create_cards(df, goal_col, actual_col, image_col, name_col, num_columns=3, header=None):
+    cards = cards_html(
+        df[goal_col], df[actual_col], thumbnails(df[image_col], PROFILE_PICTURE_SIZE), df[name_col]
+    )
+    render_card_grid(cards, CARD_CSS, num_columns, header)
+
+def sales_targets(df, num_columns=3):
+    # A month with no sales and no pace comes back as a frame without columns; the page has
+    # already warned about it, so there is nothing to draw
+    if df.empty:
+        return
+    cards = sales_targets_html(
+        df['ID'], df['PACE'], df['MIN_GOAL'], df['MAX_GOAL'],
+        thumbnails(df['PROFILE_PICTURE'], AREA_PICTURE_SIZE), df['AREA']
+    )
+    render_card_grid(cards, SALES_TARGET_CSS, num_columns)
+
+def gold_standards(df, actual_col, num_columns=3):
+    cards = cards_html(
+        df['GOAL'], df[actual_col], thumbnails(df['PICTURE_LINK'], PROFILE_PICTURE_SIZE), df['NAME'],
+        met_color=GOLD_COLOR, star=True,
+    )
+    render_card_grid(cards, CARD_CSS, num_columns)
@@ -5,7 +5,10 @@ from datetime import datetime
 import pytz
 from snowflake.snowpark.functions import col
 from transformation.sales_data import process_sales_data  # Import the function
-from features.progress_bar import sales_target  # Import sales_target function
+from features.progress_bar import sales_targets  # Import sales_targets function
+from transformation.prefetch import start_prefetcher
+from features.perf_panel import perf_panel
+from features.live import live_fragment, rerun_on_new_day
 
 # Set up Streamlit page configuration
 st.set_page_config(
@@ -13,6 +16,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Keep the cached queries warm in the background (one scheduler per process)
+start_prefetcher()
+
 st.logo("https://res.cloudinary.com/dwuzrptk6/image/upload/v1732139306/d97489eb-0834-40e3-a5b5-e93c2f0066b3_1-removebg-preview_1_z60jh6.png", size="large")
 
 # Hide Streamlit's default menu, footer, and header
@@ -55,21 +61,19 @@ year = st.sidebar.selectbox(
 def get_sales_data(month, year):
     return process_sales_data(month, year)
 
-# Process sales data based on selected month and year
-df = get_sales_data(month, year)
+# The cards refresh themselves in live mode; the rest of the page only reruns on interaction
+@live_fragment
+def area_targets():
+    rerun_on_new_day(now.date(), local_tz)
+
+    # Process sales data based on selected month and year
+    df = get_sales_data(month, year)
+
+    # Display all sales targets
+    num_columns = 3  # Adjust as needed
+    sales_targets(df, num_columns=num_columns)
 
-# Create columns to display sales targets
-num_columns = 3  # Adjust as needed
-columns = st.columns(num_columns)
+area_targets()
 
-# Iterate over each row in the dataframe and display sales targets
-for idx, row in df.iterrows():
-    with columns[idx % num_columns]:
-        sales_target(
-            area=row['AREA'],
-            pace=row['PACE'],
-            minimum_target=row['MIN_GOAL'],
-            maximum_target=row['MAX_GOAL'],  # Adjust if necessary
-            actual=row['ID'],
-            image=row['PROFILE_PICTURE']
-        )
\ No newline at end of file
+# Timings panel, shown with ?perf=1 in the URL
+perf_panel()
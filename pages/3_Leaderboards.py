@@ -1,7 +1,12 @@
 import streamlit as st
 import datetime
-from transformation.leaderboard import leaderboard_query, fm_leaderboard_query
-from transformation.contract_value_leaderboard import cv_query
+from functools import partial
+from transformation.snowflake_session import run_concurrently
+from transformation.leaderboard import leaderboard_areas
+from transformation.leaderboard_aggregation import aggregate_leaderboard, leaderboard_columns, LEADERBOARD_TOP_N
+from transformation.prefetch import start_prefetcher
+from features.perf_panel import perf_panel
+from features.leaderboard_table import leaderboard_table
 
 # Set up Streamlit page configuration
 st.set_page_config(
@@ -9,6 +14,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Keep the cached queries warm in the background (one scheduler per process)
+start_prefetcher()
+
 st.logo("https://res.cloudinary.com/dwuzrptk6/image/upload/v1735062262/Mask_group_84_mw9j9s.png", size="large")
 
 # Hide Streamlit's default menu, footer, and header
@@ -23,27 +31,10 @@ hide_streamlit_style = """
 """
 st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
-###############################################################################
-# Pull data from queries
-###############################################################################
-# 1) Energy Consultant data
-df = leaderboard_query()
-
-# 2) Field Marketer data
-fm_df = fm_leaderboard_query()
-
-# 3) Contract Value data
-#    NOTE: We expect df_cv to have:
-#      - "Sale Date" as the date column
-#      - "Area"
-#      - "Closer" or "Field Marketer" (depending on role)
-#      - "Area Picture Link" if you want to show an image for Area
-df_cv = cv_query()
-
 ###############################################################################
 # Get unique areas
 ###############################################################################
-unique_areas = sorted(df["Area"].unique())
+unique_areas = leaderboard_areas()
 
 ###############################################################################
 # Calculate default date range (first of current month - last day of current month)
@@ -59,7 +50,7 @@ end_of_month_day = end_of_month.day
 ###############################################################################
 # Sidebar-like controls
 ###############################################################################
-cols1, cols2, cols3, cols4 = st.columns([1, 1, 1, 1])
+cols1, cols2, cols3, cols4, cols5 = st.columns([1, 1, 1, 1, 0.5])
 
 with cols1:
     date_range = st.date_input(
@@ -80,113 +71,33 @@ with cols3:
 with cols4:
     role = st.selectbox("Role", ("Energy Consultant", "Field Marketer"))
 
-###############################################################################
-# 1) Filter & group ENERGY CONSULTANT data (df)
-###############################################################################
-df_filtered = df[(df["Date"] >= start_date) & (df["Date"] <= end_date)]
-
-if area:
-    df_filtered = df_filtered[df_filtered["Area"].isin(area)]
-
-# Group by dimension
-if dimension == "Rep":
-    ec_grouped_df = (
-        df_filtered
-        .groupby(["Closer", "Closer Picture Link"], as_index=False)
-        [["Sales", "Sits", "Opps"]]
-        .sum()
-        .sort_values("Sales", ascending=False)
-    )
-    ec_picture_col = "Closer Picture Link"
-    ec_name_col = "Closer"
-else:  # dimension == "Area"
-    ec_grouped_df = (
-        df_filtered
-        .groupby(["Area", "Area Picture Link"], as_index=False)
-        [["Sales", "Sits", "Opps"]]
-        .sum()
-        .sort_values("Sales", ascending=False)
-    )
-    ec_picture_col = "Area Picture Link"
-    ec_name_col = "Area"
+with cols5:
+    # Only the top LEADERBOARD_TOP_N rows are ranked and sent per page; the rest are one "Others" row
+    page = st.number_input("Page", min_value=1, value=1, step=1) if LEADERBOARD_TOP_N else 1
 
 ###############################################################################
-# 2) Filter & group FIELD MARKETER data (fm_df)
+# Aggregate in Snowflake (only the ranked rows for the selected window/areas)
 ###############################################################################
-fm_df_filtered = fm_df[(fm_df["Date"] >= start_date) & (fm_df["Date"] <= end_date)]
-
-if area:
-    fm_df_filtered = fm_df_filtered[fm_df_filtered["Area"].isin(area)]
+# Sorted tuple so the query cache is keyed on the selection, not the click order
+selected_areas = tuple(sorted(area))
 
-if dimension == "Rep":
-    fm_grouped_df = (
-        fm_df_filtered
-        .groupby(["FM", "FM Picture Link"], as_index=False)
-        [["Assists", "Sits", "Sets"]]
-        .sum()
-        .sort_values("Assists", ascending=False)
-    )
-    fm_picture_col = "FM Picture Link"
-    fm_name_col = "FM"
-else:  # dimension == "Area"
-    fm_grouped_df = (
-        fm_df_filtered
-        .groupby(["Area", "Area Picture Link"], as_index=False)
-        [["Assists", "Sits", "Sets"]]
-        .sum()
-        .sort_values("Assists", ascending=False)
-    )
-    fm_picture_col = "Area Picture Link"
-    fm_name_col = "Area"
+# 1) Activity board for the selected role (Energy Consultant or Field Marketer)
+activity_name_col, activity_picture_col, activity_metrics = leaderboard_columns(role, role, dimension)
 
-###############################################################################
-# 3) Filter & group CONTRACT VALUE data (df_cv)
-###############################################################################
-# 3a) Filter by date range using "Sale Date"
-df_cv_filtered = df_cv[
-    (df_cv["Sale Date"] >= start_date) & (df_cv["Sale Date"] <= end_date)
-]
+# 2) Contract Value board, grouped by Closer / Field Marketer / Area
+cv_name_col, cv_picture_col, cv_metrics = leaderboard_columns("Contract Value", role, dimension)
 
-# 3b) Filter by area if selected
-if area:
-    df_cv_filtered = df_cv_filtered[df_cv_filtered["Area"].isin(area)]
-
-# 3c) Decide how to group the CV data based on dimension and role
-if dimension == "Rep":
-    # If the user picks 'Energy Consultant', group by "Closer"
-    # If the user picks 'Field Marketer', group by "Field Marketer"
-    if role == "Energy Consultant":
-        cv_grouped_df = (
-            df_cv_filtered
-            .groupby(["Closer", "Closer Picture Link"], as_index=False)
-            [["CV", "Solar", "Batteries", "Roofs", "Bundled"]]
-            .sum()
-            .sort_values("CV", ascending=False)
-        )
-        cv_picture_col = "Closer Picture Link"
-        cv_name_col = "Closer"
-    else:  # role == "Field Marketer"
-        cv_grouped_df = (
-            df_cv_filtered
-            .groupby(["Field Marketer", "FM Picture Link"], as_index=False)
-            [["CV", "Solar", "Batteries", "Roofs", "Bundled"]]
-            .sum()
-            .sort_values("CV", ascending=False)
-        )
-        cv_picture_col = "FM Picture Link"
-        cv_name_col = "Field Marketer"
+# Both boards are queried at once; a cold load waits for the slower one, not both in turn
+activity_grouped_df, cv_grouped_df = run_concurrently(
+    partial(aggregate_leaderboard, role, role, dimension, start_date, end_date, selected_areas,
+            top_n=LEADERBOARD_TOP_N, page=page),
+    partial(aggregate_leaderboard, "Contract Value", role, dimension, start_date, end_date, selected_areas,
+            top_n=LEADERBOARD_TOP_N, page=page),
+)
 
-else:  # dimension == "Area"
-    # If your df_cv has "Area Picture Link", group by both "Area" and "Area Picture Link".
-    cv_grouped_df = (
-        df_cv_filtered
-        .groupby(["Area", "Area Picture Link"], as_index=False)
-        [["CV", "Solar", "Batteries", "Roofs", "Bundled"]]
-        .sum()
-        .sort_values("CV", ascending=False)
-    )
-    cv_picture_col = "Area Picture Link"
-    cv_name_col = "Area"
+def page_caption(df):
+    if df.attrs.get("pages", 1) > 1:
+        st.caption(f"Page {df.attrs['page']} of {df.attrs['pages']} ({df.attrs['total_rows']} rows)")
 
 # Round CV if desired
 cv_grouped_df["CV"] = cv_grouped_df["CV"].round(0)
@@ -202,90 +113,16 @@ tab1, tab2 = st.tabs(["Activity", "Contract Value"])
 # TAB 1 (Activity)
 ###############################################################################
 with tab1:
-    # If "Energy Consultant" was selected
-    if role == "Energy Consultant":
-        st.data_editor(
-            ec_grouped_df,
-            column_config={ec_picture_col: st.column_config.ImageColumn("")}
-            if ec_picture_col in ec_grouped_df.columns
-            else None,
-            column_order=[
-                col
-                for col in (
-                    ec_picture_col,
-                    ec_name_col,
-                    "Sales",
-                    "Sits",
-                    "Opps"
-                )
-                if col in ec_grouped_df.columns
-            ],
-            hide_index=True,
-            height=1000,
-            disabled=True,
-            use_container_width=True,
-        )
-    # If "Field Marketer" was selected
-    else:
-        st.data_editor(
-            fm_grouped_df,
-            column_config={fm_picture_col: st.column_config.ImageColumn("")}
-            if fm_picture_col in fm_grouped_df.columns
-            else None,
-            column_order=[
-                col
-                for col in (
-                    fm_picture_col,
-                    fm_name_col,
-                    "Assists",
-                    "Sits",
-                    "Sets"
-                )
-                if col in fm_grouped_df.columns
-            ],
-            hide_index=True,
-            height=1000,
-            disabled=True,
-            use_container_width=True,
-        )
+    page_caption(activity_grouped_df)
+    # Columns follow the selected role: Sales/Sits/Opps or Assists/Sits/Sets
+    leaderboard_table(activity_grouped_df, activity_picture_col, activity_name_col, activity_metrics)
 
 ###############################################################################
 # TAB 2 (Contract Value)
 ###############################################################################
 with tab2:
-    # If we have a valid picture column (e.g., Closer Picture Link, FM Picture Link, or Area Picture Link)
-    if cv_picture_col and cv_picture_col in cv_grouped_df.columns:
-        st.data_editor(
-            cv_grouped_df,
-            column_config={cv_picture_col: st.column_config.ImageColumn("")},
-            column_order=[
-                cv_picture_col,
-                cv_name_col,
-                "CV",
-                "Solar",
-                "Batteries",
-                "Roofs",
-                "Bundled",
-            ],
-            hide_index=True,
-            disabled=True,
-            use_container_width=True,
-            height=1000,
-        )
-    else:
-        # No valid picture column found, so skip that
-        st.data_editor(
-            cv_grouped_df,
-            column_order=[
-                cv_name_col,
-                "CV",
-                "Solar",
-                "Batteries",
-                "Roofs",
-                "Bundled",
-            ],
-            hide_index=True,
-            disabled=True,
-            use_container_width=True,
-            height=1000,
-        )
\ No newline at end of file
+    page_caption(cv_grouped_df)
+    leaderboard_table(cv_grouped_df, cv_picture_col, cv_name_col, cv_metrics)
+
+# Timings panel, shown with ?perf=1 in the URL
+perf_panel()
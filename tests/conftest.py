@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Snapshots and thumbnails go to a scratch directory, never the app's .cache
+_scratch = tempfile.mkdtemp(prefix="tests-")
+os.environ.setdefault("SNAPSHOT_CACHE_DIR", os.path.join(_scratch, "snapshots"))
+os.environ.setdefault("IMAGE_CACHE_DIR", os.path.join(_scratch, "images"))
+
+# The offline Snowflake stand-in lives with the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import streamlit.logger
+
+streamlit.logger.set_log_level("error")  # bare mode warns about the missing script context
+
+from fake_snowflake import SyntheticWarehouse, use_fake_snowflake
+from transformation import appointments_data, sales_data, leaderboard, contract_value_leaderboard, dimensions
+from transformation import gold_standard, leaderboard_aggregation, snapshot_cache, snowflake_session
+from transformation.snapshot_cache import SnapshotStore
+
+# Process-wide caches emptied around every test that reads the warehouse
+CACHED = [
+    leaderboard.leaderboard_areas_frame, leaderboard.leaderboard_facts,
+    leaderboard_aggregation.leaderboard_totals, sales_data.get_sales_pace, gold_standard.gs_query,
+    dimensions.rep_dimension, dimensions.area_dimension,
+    appointments_data.appointments_cache, sales_data.sales_cache, contract_value_leaderboard.cv_cache,
+    appointments_data.appointments_cube, appointments_data.process_appointments_data,
+    sales_data.sales_summary, leaderboard.leaderboard_query, leaderboard.fm_leaderboard_query,
+    leaderboard_aggregation.board_index, leaderboard_aggregation.board_database,
+]
+
+@pytest.fixture
+def snapshot_store(tmp_path, monkeypatch):
+    # An empty snapshot directory for the test, as on a cold start
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    monkeypatch.setattr(snapshot_cache, "_store", store)
+    return store
+
+@pytest.fixture
+def warehouse(snapshot_store, monkeypatch):
+    # A small synthetic warehouse behind run_query(), with every cache cold
+    warehouse = SyntheticWarehouse(areas=5, reps=50, days=90)
+    monkeypatch.setattr(snowflake_session, "get_session_pool", snowflake_session.get_session_pool)
+    use_fake_snowflake(warehouse)
+    for cached in CACHED:
+        cached.clear()
+    yield warehouse
+    for cached in CACHED:
+        cached.clear()
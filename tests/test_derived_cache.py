@@ -0,0 +1,48 @@
+import pandas as pd
+
+from transformation.derived_cache import derived_cache
+from transformation.leaderboard_aggregation import board_index, history_window
+from transformation.sales_data import sales_summary
+from transformation.snapshot_cache import snapshot_cache
+
+def test_cold_start_computes_once(snapshot_store):
+    fetches = []
+
+    @snapshot_cache("cold_facts")
+    def facts(month):
+        fetches.append(month)
+        return pd.DataFrame({"Month": [month], "Sales": [3]})
+
+    @derived_cache(lambda month: (facts.cache.current_version(month),))
+    def summary(month):
+        return facts(month).assign(Sales=lambda frame: frame["Sales"] * 2)
+
+    for _ in range(3):
+        assert summary(5)["Sales"].tolist() == [6]
+    assert (summary.cache.misses, summary.cache.hits) == (1, 2)
+    assert fetches == [5]
+
+def test_refresh_upstream_recomputes(snapshot_store):
+    sales = [3]
+
+    @snapshot_cache("refreshed_facts")
+    def facts():
+        return pd.DataFrame({"Sales": sales})
+
+    @derived_cache(lambda: (facts.cache.current_version(),))
+    def total():
+        return int(facts()["Sales"].sum())
+
+    assert total() == 3
+    sales.append(4)
+    facts.cache.refresh()
+    assert total() == 7
+    assert (total.cache.misses, total.cache.hits) == (2, 0)
+
+def test_cold_board_index_and_sales_summary_compute_once(warehouse):
+    history = history_window()
+    for _ in range(3):
+        board_index("Energy Consultant", "Closer Key", *history)
+        sales_summary(warehouse.today.month, warehouse.today.year)
+    assert (board_index.cache.misses, board_index.cache.hits) == (1, 2)
+    assert (sales_summary.cache.misses, sales_summary.cache.hits) == (1, 2)
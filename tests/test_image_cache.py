@@ -0,0 +1,101 @@
+import base64
+import functools
+import io
+import os
+import shutil
+
+import pytest
+from PIL import Image
+
+from transformation import image_cache
+from transformation.image_cache import ImageCache, read_image
+
+# Offline checks of the thumbnail cache against the fixture picture (120 × 80, transparent)
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PROFILE = os.path.join(FIXTURES, "profile.png")
+
+def decode(uri):
+    assert uri.startswith("data:image/png;base64,")
+    return Image.open(io.BytesIO(base64.b64decode(uri.split(",", 1)[1])))
+
+@pytest.fixture
+def pictures(tmp_path):
+    # Fixture directory holding the profile picture, a copy of it and a different picture
+    directory = tmp_path / "pictures"
+    directory.mkdir()
+    shutil.copy(PROFILE, directory / "profile.png")
+    shutil.copy(PROFILE, directory / "same.png")
+    Image.new("RGBA", (30, 60), (200, 0, 0, 255)).save(directory / "other.png")
+    return directory
+
+def make_cache(tmp_path, pictures, fetch=None, **kwargs):
+    fetch = fetch or functools.partial(read_image, fixture_dir=str(pictures))
+    return ImageCache(fetch=fetch, cache_dir=str(tmp_path / "thumbnails"), **kwargs)
+
+def test_thumbnail_fits_the_drawn_size(tmp_path, pictures):
+    cache = make_cache(tmp_path, pictures)
+    with decode(cache.thumbnail(str(pictures / "profile.png"), 45)) as image:
+        assert image.size == (45, 30)
+        assert image.mode == "RGBA"
+
+def test_links_to_the_same_picture_share_a_thumbnail(tmp_path, pictures):
+    cache = make_cache(tmp_path, pictures)
+    first = cache.thumbnail(str(pictures / "profile.png"), 45)
+    second = cache.thumbnail((pictures / "same.png").as_uri(), 45)
+    assert first == second
+    assert cache.stats()["links"] == 2
+    assert cache.stats()["thumbnails"] == 1
+
+def test_least_recently_used_link_is_evicted(tmp_path, pictures):
+    cache = make_cache(tmp_path, pictures, max_entries=2)
+    profile, other, same = (str(pictures / name) for name in ("profile.png", "other.png", "same.png"))
+    cache.thumbnails([profile, other], 45)
+    cache.thumbnail(profile, 45)  # profile is now the most recently used
+    cache.thumbnail(same, 45)     # evicts other
+    assert cache.stats()["links"] == 2
+    hits = cache.stats()["hits"]
+    cache.thumbnail(profile, 45)
+    assert cache.stats()["hits"] == hits + 1
+    misses = cache.stats()["misses"]
+    cache.thumbnail(other, 45)
+    assert cache.stats()["misses"] == misses + 1
+
+def test_failed_download_falls_back_then_retries(tmp_path, pictures, monkeypatch):
+    calls = []
+
+    def flaky(link):
+        calls.append(link)
+        if len(calls) == 1:
+            raise OSError("offline")
+        return read_image(link, fixture_dir=str(pictures))
+
+    cache = make_cache(tmp_path, pictures, fetch=flaky)
+    link = str(pictures / "profile.png")
+    assert cache.thumbnail(link, 45) == link
+    assert cache.stats()["failures"] == 1
+
+    # Inside the retry window the link is shown as-is without another download
+    assert cache.thumbnail(link, 45) == link
+    assert len(calls) == 1
+
+    monkeypatch.setattr(image_cache, "IMAGE_RETRY_AFTER", 0)
+    assert cache.thumbnail(link, 45).startswith("data:image/png;base64,")
+    assert len(calls) == 2
+
+def test_only_fixture_files_and_allowed_hosts_are_read(pictures):
+    assert read_image(str(pictures / "profile.png"), fixture_dir=str(pictures))
+    for link in (PROFILE, "file:///etc/hosts", "http://res.cloudinary.com/a.png", "https://example.com/a.png",
+                 str(pictures / ".." / ".." / "elsewhere.png")):
+        with pytest.raises(ValueError):
+            read_image(link, fixture_dir=str(pictures))
+
+def test_purge_keeps_the_directory_under_max_bytes(tmp_path, pictures):
+    cache = make_cache(tmp_path, pictures, max_bytes=1)
+    cache.thumbnail(str(pictures / "profile.png"), 45)
+    cache.thumbnail(str(pictures / "other.png"), 45)
+    assert len(list((tmp_path / "thumbnails").iterdir())) == 2
+
+    cache.purge_if_due(interval=3600)  # purged at startup, not due yet
+    assert len(list((tmp_path / "thumbnails").iterdir())) == 2
+    cache.purge_if_due(interval=0)
+    assert list((tmp_path / "thumbnails").iterdir()) == []
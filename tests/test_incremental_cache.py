@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from transformation.incremental_cache import IncrementalFrame
+
+class Source:
+    # A table of (ID, CREATED_AT, AREA) rows and the fetches run against it
+    def __init__(self, rows):
+        self.table = pd.DataFrame(rows, columns=["ID", "CREATED_AT", "AREA"])
+        self.table["CREATED_AT"] = pd.to_datetime(self.table["CREATED_AT"])
+        self.fetches = []
+
+    def add(self, *rows):
+        new = pd.DataFrame(rows, columns=["ID", "CREATED_AT", "AREA"])
+        new["CREATED_AT"] = pd.to_datetime(new["CREATED_AT"])
+        self.table = pd.concat([self.table, new], ignore_index=True)
+
+    def fetch(self, since):
+        self.fetches.append(since)
+        rows = self.table if since is None else self.table[self.table["CREATED_AT"] >= since]
+        # Snowflake returns rows in no particular order
+        return rows.iloc[::-1].reset_index(drop=True)
+
+def rows(frame):
+    return sorted(frame[["ID", "AREA"]].itertuples(index=False, name=None))
+
+@pytest.fixture
+def source():
+    return Source([(1, "2024-05-01 09:00", "Bend"), (2, "2024-05-02 10:00", "Salem"), (3, "2024-05-02 10:00", "Bend")])
+
+def test_refresh_fetches_from_the_watermark(source):
+    frame = IncrementalFrame(source.fetch, "CREATED_AT")
+    assert rows(frame.get()) == [(1, "Bend"), (2, "Salem"), (3, "Bend")]
+    assert frame.current_version() == 1
+
+    # A row at the watermark and one above it: the delta starts at the old watermark
+    source.add((4, "2024-05-02 10:00", "Utah"), (5, "2024-05-03 08:00", "Salem"))
+    frame.refresh()
+    assert source.fetches == [None, pd.Timestamp("2024-05-02 10:00")]
+    assert rows(frame.get()) == [(1, "Bend"), (2, "Salem"), (3, "Bend"), (4, "Utah"), (5, "Salem")]
+    assert frame.current_version() == 2
+
+def test_rows_at_the_watermark_are_replaced_not_duplicated(source):
+    frame = IncrementalFrame(source.fetch, "CREATED_AT")
+    frame.get()
+    # The row at the watermark was edited upstream; the delta brings it back once, updated
+    source.table.loc[source.table["ID"] == 3, "AREA"] = "Utah"
+    frame.refresh()
+    assert rows(frame.get()) == [(1, "Bend"), (2, "Salem"), (3, "Utah")]
+
+def test_unchanged_delta_keeps_the_version(source):
+    frame = IncrementalFrame(source.fetch, "CREATED_AT")
+    first = frame.get()
+    frame.refresh()
+    assert frame.current_version() == 1
+    assert rows(frame.get()) == rows(first)
+
+def test_rows_below_the_watermark_wait_for_a_reconcile(source):
+    frame = IncrementalFrame(source.fetch, "CREATED_AT")
+    frame.get()
+    # Late-arriving row below the watermark, and a deleted one
+    source.add((6, "2024-05-01 12:00", "Bend"))
+    source.table = source.table[source.table["ID"] != 1]
+    frame.refresh()
+    assert rows(frame.get()) == [(1, "Bend"), (2, "Salem"), (3, "Bend")]
+
+    frame.invalidate()
+    assert rows(frame.get()) == [(2, "Salem"), (3, "Bend"), (6, "Bend")]
+    assert source.fetches[-1] is None
+
+def test_trim_drops_rows_that_age_out(source):
+    cutoff = [pd.Timestamp("2024-05-01")]
+    frame = IncrementalFrame(source.fetch, "CREATED_AT", trim=lambda df: df[df["CREATED_AT"] >= cutoff[0]])
+    frame.get()
+    cutoff[0] = pd.Timestamp("2024-05-02")
+    frame.refresh()
+    assert rows(frame.get()) == [(2, "Salem"), (3, "Bend")]
+    assert frame.current_version() == 2
+
+def test_expired_ttl_refreshes_on_read(source):
+    frame = IncrementalFrame(source.fetch, "CREATED_AT", ttl=0)
+    frame.get()
+    source.add((4, "2024-05-03 08:00", "Utah"))
+    assert rows(frame.get())[-1] == (4, "Utah")
+    assert len(source.fetches) == 2
@@ -0,0 +1,146 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from transformation import leaderboard_aggregation
+from transformation.dimensions import area_keys
+from transformation.duckdb_engine import duckdb_available
+from transformation.leaderboard_aggregation import (
+    LEADERBOARDS, aggregate_leaderboard, duckdb_leaderboard_totals, history_window, leaderboard_columns,
+    leaderboard_totals, local_leaderboard_totals,
+)
+from transformation.range_index import PrefixSumIndex
+
+# The leaderboard engines checked against a pandas groupby of the same cached facts, on the
+# synthetic warehouse (90 days of data ending today, inside a 13-month history window)
+
+SELECTIONS = [
+    ("Energy Consultant", "Energy Consultant", "Rep"),
+    ("Energy Consultant", "Energy Consultant", "Area"),
+    ("Field Marketer", "Field Marketer", "Rep"),
+    ("Contract Value", "Energy Consultant", "Rep"),
+    ("Contract Value", "Field Marketer", "Rep"),
+    ("Contract Value", "Field Marketer", "Area"),
+]
+
+ENGINES = [
+    pytest.param(local_leaderboard_totals, id="local"),
+    pytest.param(duckdb_leaderboard_totals, id="duckdb",
+                 marks=pytest.mark.skipif(not duckdb_available(), reason="duckdb is not installed")),
+    pytest.param(leaderboard_totals, id="snowflake"),
+]
+
+def key_column(board, role, dimension):
+    return leaderboard_aggregation._dimension(board, role, dimension)[0]
+
+def groupby_totals(board, key_col, start_date, end_date, keys=None):
+    # What Snowflake's GROUP BY over the facts returns, in key order
+    spec = LEADERBOARDS[board]
+    facts = spec["facts"](*history_window())
+    days = pd.to_datetime(facts[spec["date"]])
+    rows = facts[(days >= pd.Timestamp(start_date)) & (days <= pd.Timestamp(end_date)) & facts[key_col].notna()]
+    if keys is not None:
+        rows = rows[rows["Area Key"].isin(keys)]
+    return rows.groupby(key_col)[spec["metrics"]].sum().reset_index()
+
+def ranges(today):
+    history_start, history_end = history_window(today)
+    return {
+        "last 30 days": (today - datetime.timedelta(days=29), today),
+        "whole history": (history_start, history_end),
+        "single day": (today, today),
+        "before the data": (history_start, history_start + datetime.timedelta(days=30)),
+        "straddles the first day": (today - datetime.timedelta(days=100), today - datetime.timedelta(days=80)),
+    }
+
+def assert_same_totals(actual, expected):
+    # Snowflake returns rows ranked, the in-process engines in key order
+    actual = actual.sort_values(actual.columns[0], ignore_index=True)
+    pd.testing.assert_frame_equal(actual, expected.reset_index(drop=True), check_dtype=False, check_exact=False, rtol=1e-9)
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("board, role, dimension", SELECTIONS)
+def test_engine_totals_match_a_groupby(warehouse, engine, board, role, dimension):
+    key_col = key_column(board, role, dimension)
+    for name, (start_date, end_date) in ranges(warehouse.today).items():
+        expected = groupby_totals(board, key_col, start_date, end_date)
+        actual = engine(board, role, dimension, start_date, end_date)
+        assert_same_totals(actual, expected)
+        assert (len(actual) == 0) == (name == "before the data")
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("board, role, dimension", SELECTIONS)
+def test_engine_totals_match_a_groupby_with_an_area_filter(warehouse, engine, board, role, dimension):
+    key_col = key_column(board, role, dimension)
+    areas = tuple(warehouse.areas[1:3])
+    start_date, end_date = warehouse.today - datetime.timedelta(days=59), warehouse.today
+    expected = groupby_totals(board, key_col, start_date, end_date, area_keys(areas))
+    assert len(expected)
+    assert_same_totals(engine(board, role, dimension, start_date, end_date, areas), expected)
+
+def test_prefix_sums_outside_the_data_are_empty():
+    days = pd.to_datetime(["2024-01-02", "2024-01-02", "2024-01-05"])
+    index = PrefixSumIndex(days, ["a", "b", "a"], [1, 1, 2], pd.DataFrame({"Sales": [1, 2, 3]}))
+    for start_date, end_date in [("2023-12-01", "2024-01-01"), ("2024-01-06", "2024-02-01"), ("2024-01-05", "2024-01-02")]:
+        keys, rows, sums = index.totals(np.datetime64(start_date), np.datetime64(end_date))
+        assert len(keys) == len(rows) == len(sums) == 0
+
+    keys, rows, sums = index.totals(np.datetime64("2023-12-01"), np.datetime64("2024-02-01"), index.area_codes([2]))
+    assert keys.tolist() == ["a"] and rows.tolist() == [1] and sums.tolist() == [[3.0]]
+    keys, _, _ = index.totals(np.datetime64("2023-12-01"), np.datetime64("2024-02-01"), index.area_codes([9]))
+    assert len(keys) == 0
+
+def is_others(frame, name_col):
+    return frame[name_col].astype(str).str.startswith("Others (")
+
+ENGINE_NAMES = ["local", pytest.param("duckdb", marks=pytest.mark.skipif(
+    not duckdb_available(), reason="duckdb is not installed")), "snowflake"]
+
+@pytest.mark.parametrize("engine", ENGINE_NAMES)
+@pytest.mark.parametrize("board, role, dimension", SELECTIONS)
+def test_pages_and_others_row(warehouse, monkeypatch, engine, board, role, dimension):
+    monkeypatch.setattr(leaderboard_aggregation, "LEADERBOARD_ENGINE", engine)
+    name_col, _, metrics = leaderboard_columns(board, role, dimension)
+    start_date, end_date = warehouse.today - datetime.timedelta(days=13), warehouse.today
+    full = aggregate_leaderboard(board, role, dimension, start_date, end_date)
+    assert not is_others(full, name_col).any()
+    top_n = 3 if dimension == "Area" else 7
+
+    pages = []
+    page = aggregate_leaderboard(board, role, dimension, start_date, end_date, top_n=top_n)
+    assert page.attrs["pages"] == -(-len(full) // top_n)
+    for number in range(1, page.attrs["pages"] + 1):
+        page = aggregate_leaderboard(board, role, dimension, start_date, end_date, top_n=top_n, page=number)
+        assert page.attrs["page"] == number
+        assert page.attrs["total_rows"] == len(full)
+        others = page[is_others(page, name_col)]
+        rows = page[~is_others(page, name_col)]
+        assert len(rows) == min(top_n, len(full) - (number - 1) * top_n)
+
+        # Everything ranked below the page is rolled into the Others row
+        below = full.iloc[number * top_n:]
+        if len(below):
+            assert others[name_col].tolist() == [f"Others ({len(below)})"]
+            for metric in metrics:
+                assert others[metric].iloc[0] == pytest.approx(below[metric].sum())
+        else:
+            assert others.empty
+        pages.append(rows)
+
+    # The pages put back together are the full ranking, ties at page boundaries included
+    pd.testing.assert_frame_equal(pd.concat(pages, ignore_index=True).astype(object), full.astype(object))
+
+    # A page past the last one shows the last page
+    last = aggregate_leaderboard(board, role, dimension, start_date, end_date, top_n=top_n, page=10_000)
+    assert last.attrs["page"] == last.attrs["pages"]
+
+@pytest.mark.parametrize("engine", ENGINE_NAMES)
+@pytest.mark.parametrize("board, role, dimension", SELECTIONS)
+def test_limit_keeps_the_top_of_the_ranking(warehouse, monkeypatch, engine, board, role, dimension):
+    monkeypatch.setattr(leaderboard_aggregation, "LEADERBOARD_ENGINE", engine)
+    start_date, end_date = warehouse.today - datetime.timedelta(days=13), warehouse.today
+    full = aggregate_leaderboard(board, role, dimension, start_date, end_date)
+    limited = aggregate_leaderboard(board, role, dimension, start_date, end_date, limit=4)
+    pd.testing.assert_frame_equal(limited.astype(object), full.head(4).astype(object))
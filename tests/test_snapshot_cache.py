@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from transformation.snapshot_cache import SnapshotCache, SnapshotStore, snapshot_key
+
+class Query:
+    # A query whose result changes on every run; runs after the first can be held back
+    def __init__(self):
+        self.runs = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, month, areas=()):
+        self.runs += 1
+        if self.runs > 1:
+            self.release.wait(5)
+        return pd.DataFrame({"Month": [month], "Run": [self.runs]})
+
+def wait_for_refreshes(cache):
+    for thread in threading.enumerate():
+        if thread.name == f"snapshot-refresh-{cache.name}":
+            thread.join(5)
+
+def run_of(frame):
+    return int(frame["Run"].iloc[0])
+
+def test_stale_entry_is_served_while_it_refreshes(snapshot_store):
+    query = Query()
+    cache = SnapshotCache("swr", query, ttl=0)
+    assert run_of(cache.get(5)) == 1
+
+    # Stale: the old result comes back right away while the query runs in the background
+    query.release.clear()
+    assert run_of(cache.get(5)) == 1
+    assert run_of(cache.get(5)) == 1
+    query.release.set()
+    wait_for_refreshes(cache)
+    assert query.runs == 2  # one background refresh at a time
+    assert run_of(cache.get(5, ())) == 2
+    wait_for_refreshes(cache)
+
+def test_fresh_entry_is_not_refetched(snapshot_store):
+    query = Query()
+    cache = SnapshotCache("fresh", query, ttl=600)
+    version = cache.current_version(5)
+    for _ in range(3):
+        assert run_of(cache.get(5)) == 1
+    assert cache.current_version(month=5, areas=()) == version
+    assert query.runs == 1
+    assert 0 < cache.expires_in(5) <= 600
+
+def test_cold_process_starts_from_the_snapshot(snapshot_store):
+    query = Query()
+    SnapshotCache("shared", query, ttl=600).get(5)
+
+    # Another process: nothing in memory, the snapshot on disk is fresh enough to serve as-is
+    other = SnapshotCache("shared", query, ttl=600)
+    assert run_of(other.get(5)) == 1
+    assert query.runs == 1
+
+    # A stale snapshot is served too, and refreshed in the background
+    stale = SnapshotCache("shared", query, ttl=0)
+    assert run_of(stale.get(5)) == 1
+    wait_for_refreshes(stale)
+    frame, _ = snapshot_store.load(snapshot_key("shared", 5, ()))
+    assert run_of(frame) == 2
+
+def test_purge_drops_old_snapshots_and_their_locks(tmp_path):
+    store = SnapshotStore(str(tmp_path), max_age=60)
+    frame = pd.DataFrame({"Sales": [1, 2]})
+    for key in ("old", "new"):
+        store.save(key, frame)
+        with store.lock(key):
+            pass
+    old = time.time() - 120
+    os.utime(store.path("old"), (old, old))
+
+    store.purge()
+    assert sorted(os.listdir(tmp_path)) == ["new.parquet", "new.parquet.lock"]
+
+def test_purge_keeps_a_lock_held_by_a_refresh(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    with store.lock("cold") as acquired:
+        assert acquired
+        store.purge()
+        assert os.path.exists(f"{store.path('cold')}.lock")
+    store.purge()
+    assert os.listdir(tmp_path) == []
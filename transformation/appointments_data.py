@@ -1,52 +1,32 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from datetime import datetime
-from snowflake.snowpark import Session
-from snowflake.snowpark.context import get_active_session
+import pytz
+from datetime import datetime, timedelta
 from snowflake.snowpark.functions import col
+from transformation.snowflake_session import run_query
+from transformation.calendar_grid import DailyCube, to_days
+from transformation.incremental_cache import IncrementalFrame
+from transformation.dimensions import AREA_PICTURES, DEFAULT_PICTURE
+from transformation.snapshot_cache import snapshot_key
+from transformation.derived_cache import derived_cache
 
-# Function to create a Snowflake session
-@st.cache_resource
-def create_snowflake_session():
-    try:
-        return get_active_session()
-    except:
-        connection_parameters = {
-            "account": st.secrets["snowflake"]["account"],
-            "user": st.secrets["snowflake"]["user"],
-            "password": st.secrets["snowflake"]["password"],
-            "role": st.secrets["snowflake"]["role"],
-            "warehouse": st.secrets["snowflake"]["warehouse"],
-            "database": st.secrets["snowflake"]["database"],
-            "schema": st.secrets["snowflake"]["schema"],
-        }
-        return Session.builder.configs(connection_parameters).create()
-
-profile_pictures = {
-    'Salem': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863720/salem_eckoe1.png',
-    'Portland North': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730865202/Group_1127_zhbvez.png',
-    'Des Moines': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863717/des_moines_mcwvbz.png',
-    'Minneapolis': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863713/minneapolis_jlnpqw.png',
-    'Portland': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863714/portland_iwid9m.png',
-    'Pasco': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863718/pasco_fxdzsg.png',
-    'Medford': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863720/medford_ks5ol1.png',
-    'Bozeman': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863714/bozeman_z1dcyw.png',
-    'Cincinnati': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1733779348/Cincinnati_2-Photoroom_rxg5dz.png',
-    'Helena': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863713/helena_b0lpfy.png',
-    'Cedar Rapids': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730865480/Group_1128_bckfag.png',
-    'Missoula': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863715/missoulda_lmfros.png',
-    'Puget Sound': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1733779404/PugetSound-Photoroom_wmj5k7.png',
-    'Spokane': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863715/spokane_i8tixp.png',
-    'Bend': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863714/bend_dvre85.png',
-    'Billings': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863716/billings_hezzk6.png',
-    'Utah': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1733790161/Asset_2_zfodre.png'
-}
-
-@st.cache_data(ttl=600)
-def get_appointments():
-    session = create_snowflake_session()
-    appointments_query = """
+# The TV pages work out "today" in this timezone
+LOCAL_TZ = pytz.timezone('America/Los_Angeles')
+
+# Days of appointments the Sets page can show
+APPOINTMENT_DAYS = 30
+
+def appointments_start():
+    # First day of the trailing window, from the same clock for the query and for trimming
+    # (Snowflake's CURRENT_DATE follows the session timezone, not the pages')
+    return datetime.now(LOCAL_TZ).date() - timedelta(days=APPOINTMENT_DAYS)
+
+def appointments_sql(since=None):
+    # With `since`, only rows created at or after that timestamp (incremental refresh)
+    since_filter = "AND created_at >= ?" if since is not None else ""
+
+    appointments_query = f"""
         SELECT 
             created_at, 
             id, 
@@ -56,7 +36,7 @@ def get_appointments():
         FROM analytics.reporting.tbl_master_opportunities 
         LEFT JOIN operational.enrichment.vw_area_goals 
                ON tbl_master_opportunities.area = vw_area_goals.area
-        WHERE CREATED_AT >= DATEADD("day", -30, CURRENT_DATE) 
+        WHERE CREATED_AT >= ?
           AND IFNULL(tbl_master_opportunities.area, fm_area) IN (
               'Salem', 'North Portland', 'Des Moines', 'Minneapolis', 'Portland',
               'Pasco', 'Medford', 'Bozeman', 'Cincinnati', 'Helena', 
@@ -64,93 +44,67 @@ def get_appointments():
               'Billings', 'Utah'
           )
           AND lead_generator IS NOT NULL
+          {since_filter}
     """
-    return session.sql(appointments_query).to_pandas()
+    return appointments_query, [appointments_start()] + ([since] if since is not None else [])
 
-def process_appointments_data(selected_date_range):
-    # 1. Fetch appointments data
-    df = get_appointments()
+def fetch_appointments(since=None):
+    appointments_query, params = appointments_sql(since)
+    return run_query(appointments_query, params)
 
-    # 2. Convert 'CREATED_AT' to date
-    df['CREATED_AT'] = pd.to_datetime(df['CREATED_AT']).dt.date
+def trim_appointments(df):
+    # The query covers the trailing window; drop rows that aged out since the last full fetch
+    return df[to_days(df['CREATED_AT']) >= pd.Timestamp(appointments_start())]
 
-    # 3. Create a date range for the selected date range
-    start_date, end_date = selected_date_range
-    date_range = pd.date_range(start=start_date, end=end_date)
-
-    # 4. Build a dictionary of daily goals from the first value we see in Snowflake's GOALS
-    #    (If your Snowflake data truly has different daily goals by date, adjust accordingly.)
-    daily_goals_dict = (
-        df.groupby('AREA', as_index=False)
-          .agg({'GOALS': 'first'})
-          .set_index('AREA')['GOALS']
-          .to_dict()
-    )
-
-    # 5. Default profile picture URL
-    default_profile_picture = 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730865202/Group_1127_zhbvez.png'
-
-    # 6. Build a "goals_df" with one row per (area, date), 
-    #    setting weekend goals to 0 exactly as the original code did.
-    all_areas = df['AREA'].unique().tolist()
-    goals_df = pd.DataFrame(
-        [
-            (
-                area,
-                daily_goals_dict.get(area, 0) if single_date.weekday() < 5 else 0,
-                single_date.date(),
-                profile_pictures.get(area, default_profile_picture)
-            )
-            for area in all_areas
-            for single_date in date_range
-        ],
-        columns=['AREA', 'GOALS', 'CREATED_AT', 'PROFILE_PICTURE']
+@st.cache_resource
+def appointments_cache():
+    return IncrementalFrame(
+        fetch_appointments, 'CREATED_AT', trim=trim_appointments,
+        snapshot_key=snapshot_key('get_appointments')
     )
 
-    # 7. Convert CREATED_AT to date in goals_df
-    goals_df['CREATED_AT'] = pd.to_datetime(goals_df['CREATED_AT']).dt.date
-
-    # 8. Drop 'GOALS' and 'PROFILE_PICTURE' from the original df to avoid conflicts
-    df = df.drop(columns=['GOALS', 'PROFILE_PICTURE'])
+def get_appointments():
+    return appointments_cache().get()
 
-    # 9. Merge appointments data with our artificial daily goals data
-    df = df.merge(goals_df, on=['AREA', 'CREATED_AT'], how='outer')
+# Daily counts/goals per area for everything currently cached, rebuilt when the appointments refresh
+@derived_cache(lambda: (appointments_cache().current_version(),), max_entries=1)
+def appointments_cube():
+    return DailyCube(get_appointments(), 'AREA', 'CREATED_AT', 'ID', 'GOALS')
 
-    # 10. Filter for the selected date range
-    df = df[(df['CREATED_AT'] >= start_date) & (df['CREATED_AT'] <= end_date)]
+# Reruns for the same date range reuse the result until the appointments refresh
+@derived_cache(lambda selected_date_range: (appointments_cache().current_version(),))
+def process_appointments_data(selected_date_range):
+    # 1. Daily rollup of the appointments data (built once per refresh)
+    cube = appointments_cube()
 
-    # 11. Group by AREA, CREATED_AT to get daily totals
-    daily_df = df.groupby(['AREA', 'CREATED_AT']).agg({
-        'ID': 'count',
-        'GOALS': 'first',  # same daily goal per area & day
-        'PROFILE_PICTURE': 'first'
-    }).reset_index()
+    # 2. Totals per AREA over the selected range: appointment counts from the prefix sums
+    #    (days without appointments are 0) and the daily goal on each weekday, taken from the
+    #    first value we see in Snowflake's GOALS
+    #    (If your Snowflake data truly has different daily goals by date, adjust accordingly.)
+    start_date, end_date = selected_date_range
+    df_groupby = pd.DataFrame({
+        'AREA': cube.areas,
+        'ID': cube.counts(start_date, end_date),
+        'GOALS': cube.goals(start_date, end_date),
+    })
 
-    # 12. Sum over the date range per AREA
-    df_groupby = daily_df.groupby('AREA').agg({
-        'ID': 'sum',
-        'GOALS': 'sum',
-        'PROFILE_PICTURE': 'first'
-    }).reset_index()
+    # 3. Profile picture per AREA, with a default
+    df_groupby['PROFILE_PICTURE'] = df_groupby['AREA'].map(AREA_PICTURES).fillna(DEFAULT_PICTURE)
 
-    # 13. Fill NaNs in GOALS before casting
+    # 4. Fill NaNs in GOALS before casting
     df_groupby['GOALS'] = df_groupby['GOALS'].fillna(0).astype(int)
 
-    # 14. Clean up PROFILE_PICTURE
-    df_groupby['PROFILE_PICTURE'].replace('', np.nan, inplace=True)
-    df_groupby['PROFILE_PICTURE'] = df_groupby['PROFILE_PICTURE'].fillna(default_profile_picture)
-
-    # 15. Convert ID to int
+    # 5. Convert ID to int
     df_groupby['ID'] = pd.to_numeric(df_groupby['ID'], errors='coerce').fillna(0).astype(int)
 
-    # 16. Calculate Percent of Total (ID / GOALS)
+    # 6. Calculate Percent of Total (ID / GOALS)
     df_groupby['Percent of Total'] = np.where(
         df_groupby['GOALS'] != 0,
         (df_groupby['ID'] / df_groupby['GOALS']).round(2),
         0
     )
 
-    # 17. Sort final data by AREA
+    # 7. Sort final data by AREA
     df_groupby = df_groupby.sort_values(by='AREA')
 
-    return df_groupby
\ No newline at end of file
+    return df_groupby
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import union_categoricals
+
+# Query results are converted from Arrow column by column into compact pandas dtypes:
+#   - strings (areas, names, picture links) -> category when values repeat
+#   - DATE -> datetime64 (pandas has no day unit; values sit at midnight) instead of date objects
+#   - integers / NUMBER(p, 0) -> the smallest of int16/int32/int64 that holds them; with NULLs,
+#     pandas' nullable Int64 so 64-bit keys (HASH) keep full precision instead of turning into floats
+#   - NUMBER(p, s) -> float64, the same as to_pandas gives
+
+# A string column becomes categorical when it has at most this share of distinct values
+CATEGORY_MAX_RATIO = 0.5
+
+# Counts are summed and added together downstream, so never go below int16
+INT_DTYPES = (np.int16, np.int32, np.int64)
+
+NULLABLE_INTS = {
+    pa.int8(): pd.Int64Dtype(), pa.int16(): pd.Int64Dtype(), pa.int32(): pd.Int64Dtype(),
+    pa.int64(): pd.Int64Dtype(), pa.uint8(): pd.Int64Dtype(), pa.uint16(): pd.Int64Dtype(),
+    pa.uint32(): pd.Int64Dtype(), pa.uint64(): pd.UInt64Dtype(),
+}
+
+def arrow_to_frame(table):
+    return pd.DataFrame(
+        {name: _typed_column(column) for name, column in zip(table.column_names, table.columns)},
+        index=pd.RangeIndex(table.num_rows)
+    )
+
+def _typed_column(column):
+    column_type = column.type
+    if pa.types.is_date(column_type):
+        return pd.Series(column.to_pandas(date_as_object=False).to_numpy())
+    if pa.types.is_decimal(column_type) and column_type.scale == 0:
+        try:
+            column = column.cast(pa.int64())
+            column_type = column.type
+        except pa.ArrowInvalid:
+            pass  # Wider than int64
+    if pa.types.is_decimal(column_type):
+        return column.to_pandas().astype(float)
+    if pa.types.is_integer(column_type):
+        if column.null_count:
+            return column.to_pandas(types_mapper=NULLABLE_INTS.get)
+        return _small_ints(column.to_pandas())
+    if pa.types.is_string(column_type) or pa.types.is_large_string(column_type):
+        values = column.to_pandas()
+        if len(values) and values.nunique(dropna=True) <= len(values) * CATEGORY_MAX_RATIO:
+            return values.astype("category")
+        return values
+    return column.to_pandas()
+
+def _small_ints(values):
+    if values.empty:
+        return values
+    low, high = values.min(), values.max()
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values
+
+def concat_frames(frames):
+    # pd.concat, but categorical columns stay categorical when the pieces have different categories
+    frames = [frame for frame in frames if frame is not None]
+    result = pd.concat(frames, ignore_index=True)
+    for name in frames[0].columns:
+        pieces = [frame[name] for frame in frames if name in frame]
+        if all(isinstance(piece.dtype, pd.CategoricalDtype) for piece in pieces) and not isinstance(result[name].dtype, pd.CategoricalDtype):
+            result[name] = pd.Series(union_categoricals(pieces, ignore_order=True), index=result.index)
+    return result
+
+def _row_order(frame):
+    # Rows sorted on every column (categories by value, not by code, and NULLs first), so
+    # frames holding the same rows in a different order line up
+    if frame.empty or not len(frame.columns):
+        return frame
+    codes = [
+        pd.factorize(column.astype(object) if isinstance(column.dtype, pd.CategoricalDtype) else column, sort=True)[0]
+        for _, column in frame.items()
+    ]
+    return frame.iloc[np.lexsort(codes[::-1])]
+
+def same_rows(left, right):
+    # Value equality of the rows in any order, ignoring category sets and integer widths
+    # (a delta has fewer categories, and the delta queries have no ORDER BY)
+    if list(left.columns) != list(right.columns) or len(left) != len(right):
+        return False
+    left, right = _row_order(left), _row_order(right)
+    for name in left.columns:
+        a, b = left[name].reset_index(drop=True), right[name].reset_index(drop=True)
+        if not a.equals(b) and not a.astype(object).equals(b.astype(object)):
+            return False
+    return True
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+# Area × day calendar helpers shared by the appointments and sales transforms.
+# Everything is built from whole arrays; there are no per-(area, day) Python loops.
+
+def area_day_index(areas, start_date, end_date, date_name='DATE'):
+    # One entry per (area, day), area-major, covering every day in [start_date, end_date]
+    days = pd.date_range(start=start_date, end=end_date)
+    return pd.MultiIndex.from_product(
+        [pd.Index(areas, name='AREA'), days],
+        names=['AREA', date_name]
+    )
+
+def to_days(values):
+    # Timestamps -> midnight datetime64, keeping the local wall-clock date for tz-aware values
+    values = pd.to_datetime(values)
+    if values.dt.tz is not None:
+        values = values.dt.tz_localize(None)
+    return values.dt.normalize()
+
+def daily_counts(df, area_col, date_col, id_col, index):
+    # Count IDs per (area, day) and reindex onto the calendar; days with no rows become 0
+    counts = df.groupby([df[area_col], to_days(df[date_col])])[id_col].count()
+    counts.index.names = index.names
+    return counts.reindex(index, fill_value=0)
+
+def area_totals(series):
+    # Sum a calendar series over its days, one value per area (in calendar order)
+    return series.groupby(level='AREA', sort=False).sum()
+
+# Per-area daily counts and goals with prefix sums over the days, built once per data refresh.
+# A date-range total is then two column lookups per area instead of a calendar build + groupbys.
+class DailyCube:
+    def __init__(self, df, area_col, date_col, id_col, goal_col):
+        self.areas = sorted(df[area_col].unique().tolist())
+        days = to_days(df[date_col]).dropna()
+        self.first_day = days.min().to_datetime64().astype('datetime64[D]') if not days.empty else None
+        last_day = days.max().to_datetime64().astype('datetime64[D]') if not days.empty else None
+
+        # prefix[a, i] = count for area a over the first i days, so any span is prefix[hi] - prefix[lo]
+        if self.first_day is None:
+            self._prefix = np.zeros((len(self.areas), 1), dtype=np.int64)
+        else:
+            calendar = area_day_index(self.areas, self.first_day, last_day, date_col)
+            counts = daily_counts(df, area_col, date_col, id_col, calendar).to_numpy(dtype=np.int64)
+            counts = counts.reshape(len(self.areas), -1)
+            self._prefix = np.zeros((len(self.areas), counts.shape[1] + 1), dtype=np.int64)
+            np.cumsum(counts, axis=1, out=self._prefix[:, 1:])
+
+        # First GOALS value seen per area, applied on weekdays
+        goals = df.groupby(area_col, observed=True)[goal_col].first()
+        self._daily_goals = goals.reindex(self.areas).to_numpy(dtype=float, na_value=0)
+
+    def counts(self, start_date, end_date):
+        # Total per area (in self.areas order) over [start_date, end_date]; days outside the data are 0
+        if self.first_day is None:
+            return np.zeros(len(self.areas), dtype=np.int64)
+        last = self._prefix.shape[1] - 1
+        lo = int(np.clip((np.datetime64(start_date, 'D') - self.first_day).astype(int), 0, last))
+        hi = int(np.clip((np.datetime64(end_date, 'D') - self.first_day).astype(int) + 1, 0, last))
+        if hi <= lo:
+            return np.zeros(len(self.areas), dtype=np.int64)
+        return self._prefix[:, hi] - self._prefix[:, lo]
+
+    def goals(self, start_date, end_date):
+        # Daily goal × number of Monday-Friday days in [start_date, end_date]
+        start, end = np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D')
+        weekdays = np.busday_count(start, end + 1) if end >= start else 0
+        return self._daily_goals * weekdays
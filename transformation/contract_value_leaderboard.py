@@ -3,48 +3,49 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from snowflake.snowpark import Session
-from snowflake.snowpark.context import get_active_session
 from snowflake.snowpark.functions import col
+from transformation.snowflake_session import run_query
+from transformation.query_params import in_clause
+from transformation.incremental_cache import IncrementalFrame
+from transformation.snapshot_cache import snapshot_key
+from transformation.dimensions import key_sql
 
-# Function to create a Snowflake session
-@st.cache_resource
-def create_snowflake_session():
-    try:
-        return get_active_session()
-    except:
-        connection_parameters = {
-            "account": st.secrets["snowflake"]["account"],
-            "user": st.secrets["snowflake"]["user"],
-            "password": st.secrets["snowflake"]["password"],
-            "role": st.secrets["snowflake"]["role"],
-            "warehouse": st.secrets["snowflake"]["warehouse"],
-            "database": st.secrets["snowflake"]["database"],
-            "schema": st.secrets["snowflake"]["schema"],
-        }
-        return Session.builder.configs(connection_parameters).create()
+def cv_sql(start_date, end_date, areas=(), since=None):
 
-@st.cache_data(ttl=600)
-def cv_query():
+    area_filter, area_params = in_clause("tbl_master_opportunities.area", areas)
+    # With `since`, only sales on or after that date (incremental refresh)
+    since_filter = "AND sale_date >= ?" if since is not None else ""
+    since_params = [since] if since is not None else []
 
-    session = create_snowflake_session()
-
-    cv_query = """
+    cv_query = f"""
         SELECT
             id,
             sale_date "Sale Date",
-            closer "Closer",
-            IFNULL(closer_picture_link, 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730865202/Group_1127_zhbvez.png') "Closer Picture Link",
-            fm_picture_link "FM Picture Link",
-            lead_generator "Field Marketer",
-            tbl_master_opportunities.area "Area",
-            area_links.picture_link "Area Picture Link",
+            {key_sql('closer')} "Closer Key",
+            {key_sql('lead_generator')} "Field Marketer Key",
+            {key_sql('tbl_master_opportunities.area')} "Area Key",
             COUNT(DISTINCT CASE WHEN project_sub_category = 'Solar' THEN id END) "Solar",
             COUNT(DISTINCT CASE WHEN project_sub_category = 'Battery' THEN id END) "Batteries",
             COUNT(DISTINCT CASE WHEN project_sub_category = 'Roof' OR project_sub_category LIKE 'Reroof%' THEN id END) "Roofs",
             COUNT(DISTINCT CASE WHEN project_sub_category LIKE 'Solar +%' THEN id END) "Bundled",
             grand_total - lender_fee_total "CV"
         FROM analytics.reporting.tbl_master_opportunities
-        LEFT JOIN raw.snowflake.area_links ON tbl_master_opportunities.area = area_links.area
+        WHERE sale_date BETWEEN ? AND ?
+        {area_filter}
+        {since_filter}
         GROUP BY ALL """
-    return session.sql(cv_query).to_pandas()
\ No newline at end of file
+    return cv_query, [start_date, end_date, *area_params, *since_params]
+
+def fetch_cv(start_date, end_date, areas=(), since=None):
+    cv_query, params = cv_sql(start_date, end_date, areas, since)
+    return run_query(cv_query, params)
+
+@st.cache_resource(max_entries=32)
+def cv_cache(start_date, end_date, areas=()):
+    return IncrementalFrame(
+        lambda since: fetch_cv(start_date, end_date, areas, since), 'Sale Date',
+        snapshot_key=snapshot_key('cv_query', start_date, end_date, areas)
+    )
+
+def cv_query(start_date, end_date, areas=()):
+    return cv_cache(start_date, end_date, areas).get()
\ No newline at end of file
@@ -0,0 +1,67 @@
+import functools
+import threading
+from collections import OrderedDict
+import pandas as pd
+from transformation.snapshot_cache import shared_frame
+from transformation.perf import timed, frame_size
+
+# Processed frames kept per decorated function (least recently used are dropped first)
+DERIVED_ENTRIES = 32
+
+def _share(result):
+    # Frames go out as copy-on-write views; other results (e.g. a DailyCube) are read-only by convention
+    return shared_frame(result) if isinstance(result, pd.DataFrame) else result
+
+# Memoizes a transform of cached query results. versions(*args) returns the versions of the
+# upstream data the transform reads; an entry is reused only while those versions match, so a
+# refresh upstream invalidates it automatically. Entries are keyed on the arguments alone, so
+# a refreshed result replaces the stale one instead of taking another LRU slot.
+class DerivedCache:
+    def __init__(self, compute, versions, max_entries=DERIVED_ENTRIES):
+        self._compute = compute
+        self._versions = versions
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # repr(args) -> (versions, result)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, *args):
+        key = repr(args)
+        with timed(f"derived.{self._compute.__name__}", cache="hit") as sample:
+            versions = self._versions(*args)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == versions:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return _share(entry[1])
+                self.misses += 1
+
+            sample["cache"] = "miss"
+            result = self._compute(*args)
+            sample["rows"], sample["nbytes"] = frame_size(result)
+            with self._lock:
+                self._entries[key] = (versions, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return _share(result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def derived_cache(versions, max_entries=DERIVED_ENTRIES):
+    # Decorator: @derived_cache(lambda month, year: (...upstream versions...))
+    def decorator(compute):
+        cache = DerivedCache(compute, versions, max_entries)
+
+        @functools.wraps(compute)
+        def wrapper(*args):
+            return cache.get(*args)
+
+        wrapper.cache = cache
+        wrapper.clear = cache.clear
+        return wrapper
+    return decorator
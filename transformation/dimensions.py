@@ -0,0 +1,114 @@
+from transformation.snowflake_session import run_query
+from transformation.snapshot_cache import snapshot_cache
+
+# Rep and area metadata (display name + picture link) lives in small dimension tables fetched
+# once; fact queries only carry an integer key per rep/area and are joined back for display.
+
+# Area pictures used by the Sets and Sales cards
+AREA_PICTURES = {
+    'Salem': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863720/salem_eckoe1.png',
+    'Portland North': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730865202/Group_1127_zhbvez.png',
+    'Des Moines': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863717/des_moines_mcwvbz.png',
+    'Minneapolis': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863713/minneapolis_jlnpqw.png',
+    'Portland': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863714/portland_iwid9m.png',
+    'Pasco': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863718/pasco_fxdzsg.png',
+    'Medford': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863720/medford_ks5ol1.png',
+    'Bozeman': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863714/bozeman_z1dcyw.png',
+    'Cincinnati': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1733779348/Cincinnati_2-Photoroom_rxg5dz.png',
+    'Helena': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863713/helena_b0lpfy.png',
+    'Cedar Rapids': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730865480/Group_1128_bckfag.png',
+    'Missoula': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863715/missoulda_lmfros.png',
+    'Puget Sound': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1733779404/PugetSound-Photoroom_wmj5k7.png',
+    'Spokane': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863715/spokane_i8tixp.png',
+    'Bend': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863714/bend_dvre85.png',
+    'Billings': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730863716/billings_hezzk6.png',
+    'Utah': 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1733790161/Asset_2_zfodre.png'
+}
+
+# Shown for reps and areas without a picture
+DEFAULT_PICTURE = 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730865202/Group_1127_zhbvez.png'
+
+# Dimension tables change rarely (new reps, new pictures)
+DIMENSION_TTL = 3600
+
+# A fact key missing from the dimension triggers one refresh, at most this often
+MISSING_KEY_REFRESH = 60
+
+def key_sql(column):
+    # Integer key for a name column: HASH() is stable across queries and processes, so keys in
+    # cached and persisted fact frames always match the dimension. NULL names keep a NULL key.
+    return f"CASE WHEN {column} IS NOT NULL THEN HASH({column}) END"
+
+@snapshot_cache('rep_dimension', ttl=DIMENSION_TTL)
+def rep_dimension():
+
+    # Every closer and field marketer the boards can show. The closer and field marketer
+    # pictures are kept apart (one person can have both), as the per-board queries chose them.
+    # The whole tables are read, not just the leaderboard history window: the Snowflake engine
+    # answers any date range, so every key it can return needs a name. Only these few columns
+    # are scanned, once per DIMENSION_TTL for the whole box (the snapshot is shared).
+    rep_query = f"""
+        SELECT {key_sql('rep_name')} "Key", rep_name "Name",
+            MAX(CASE WHEN role = 'Closer' THEN picture_link END) "Closer Picture Link",
+            MAX(CASE WHEN role = 'FM' THEN picture_link END) "FM Picture Link"
+        FROM (
+            SELECT closer AS rep_name, 'Closer' AS role, closer_picture_link AS picture_link FROM analytics.team_reporting.dtbl_sales_leaderboard
+            UNION ALL
+            SELECT lead_generator, 'FM', fm_picture_link FROM analytics.team_reporting.dtbl_sales_leaderboard
+            UNION ALL
+            SELECT closer, 'Closer', closer_picture_link FROM analytics.reporting.tbl_master_opportunities
+            UNION ALL
+            SELECT lead_generator, 'FM', fm_picture_link FROM analytics.reporting.tbl_master_opportunities
+        ) reps
+        WHERE rep_name IS NOT NULL
+        GROUP BY rep_name
+    """
+    return run_query(rep_query)
+
+@snapshot_cache('area_dimension', ttl=DIMENSION_TTL)
+def area_dimension():
+
+    area_query = f"""
+        SELECT {key_sql('area')} "Key", area "Name", MAX(picture_link) "Picture Link"
+        FROM (
+            SELECT area, area_picture_link AS picture_link FROM analytics.team_reporting.dtbl_sales_leaderboard
+            UNION ALL
+            SELECT area, picture_link FROM raw.snowflake.area_links
+            UNION ALL
+            SELECT area, NULL FROM analytics.reporting.tbl_master_opportunities
+        ) areas
+        WHERE area IS NOT NULL
+        GROUP BY area
+    """
+    return run_query(area_query)
+
+def attach_dimension(frame, key_col, dimension, name_col, picture_col):
+    # Replace an integer key column with the dimension's display name and picture link
+    lookup = dimension()
+    missing = ~frame[key_col].dropna().isin(lookup["Key"])
+    if missing.any() and dimension.cache.expires_in() < DIMENSION_TTL - MISSING_KEY_REFRESH:
+        # A rep/area newer than the cached dimension: fetch it again once
+        dimension.cache.refresh()
+        lookup = dimension()
+
+    # Reps carry one picture column per role, named like the board's picture column; areas have one
+    picture_source = picture_col if picture_col in lookup.columns else "Picture Link"
+    lookup = lookup[["Key", "Name", picture_source]].rename(
+        columns={"Key": key_col, "Name": name_col, picture_source: picture_col}
+    )
+    frame = frame.merge(lookup, on=key_col, how="left").drop(columns=key_col)
+    frame[picture_col] = frame[picture_col].astype(object).fillna(DEFAULT_PICTURE)
+    return frame
+
+def area_keys(names):
+    # Keys of the named areas, or None when one of them is not in the dimension even after a
+    # refresh (the in-process engines can't filter on it; Snowflake filters on the name itself)
+    names = set(names)
+    lookup = area_dimension()
+    if not names <= set(lookup["Name"]) and area_dimension.cache.expires_in() < DIMENSION_TTL - MISSING_KEY_REFRESH:
+        area_dimension.cache.refresh()
+        lookup = area_dimension()
+    if not names <= set(lookup["Name"]):
+        return None
+    # Selected with isin, not reindex, so the 64-bit keys stay integers
+    return lookup.loc[lookup["Name"].isin(names), "Key"]
@@ -0,0 +1,75 @@
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+
+from transformation.perf import timed
+
+try:
+    import duckdb
+except ImportError:  # Optional: LEADERBOARD_ENGINE=duckdb needs `pip install duckdb`
+    duckdb = None
+
+# Leaderboard facts loaded into an in-process DuckDB database, so date/area/rep aggregations run
+# as SQL over columnar storage in this process instead of as GROUP BYs in the warehouse.
+# Facts are stored sorted by date, so DuckDB's per-block min/max skips blocks outside a range.
+
+# Threads per query and memory cap of each facts database
+DUCKDB_THREADS = int(os.environ.get("DUCKDB_THREADS", "4"))
+DUCKDB_MEMORY_LIMIT = os.environ.get("DUCKDB_MEMORY_LIMIT", "1GB")
+
+def duckdb_available():
+    return duckdb is not None
+
+class FactsDatabase:
+    def __init__(self, facts, date_col, key_cols, metrics):
+        # facts: a cached fact frame; only the date, key and metric columns are loaded
+        self._date_col = date_col
+        # Integer metrics are summed to BIGINT (SUM alone gives HUGEINT, which pandas turns into floats)
+        self._integer_metrics = {metric for metric in metrics if pd.api.types.is_integer_dtype(facts[metric].dtype)}
+        self._connection = duckdb.connect(":memory:", config={"threads": DUCKDB_THREADS, "memory_limit": DUCKDB_MEMORY_LIMIT})
+        self._lock = threading.Lock()
+
+        columns = list(dict.fromkeys([date_col, *key_cols, *metrics]))
+        incoming = pa.Table.from_pandas(facts[columns], preserve_index=False)
+        # Dates are midnight timestamps in pandas; stored as DATE so ranges compare with date parameters
+        select = ", ".join(
+            f'CAST("{column}" AS DATE) "{column}"' if column == date_col else f'"{column}"' for column in columns
+        )
+        with timed("duckdb.load", rows=incoming.num_rows, nbytes=incoming.nbytes):
+            self._connection.register("incoming", incoming)
+            self._connection.execute(f'CREATE TABLE facts AS SELECT {select} FROM incoming ORDER BY "{date_col}"')
+            self._connection.unregister("incoming")
+
+    def _cursor(self):
+        # A connection is not safe to share across threads; each query gets its own cursor
+        with self._lock:
+            return self._connection.cursor()
+
+    def totals(self, key_col, metrics, start_date, end_date, area_keys=None, limit=None):
+        # Same frame as leaderboard_totals: one row per key with rows in [start_date, end_date], in
+        # key order. With a limit, the top `limit` by the first metric plus every row tied with the
+        # last one; the caller ranks them and breaks ties by name.
+        metric_sums = ", ".join(
+            f'COALESCE(SUM("{metric}"), 0)::{"BIGINT" if metric in self._integer_metrics else "DOUBLE"} "{metric}"'
+            for metric in metrics
+        )
+        area_filter = 'AND list_contains(?, "Area Key")' if area_keys is not None else ""
+        area_params = [list(map(int, area_keys))] if area_keys is not None else []
+        limit_clause = f'QUALIFY RANK() OVER (ORDER BY COALESCE(SUM("{metrics[0]}"), 0) DESC) <= {int(limit)}' if limit else ""
+        totals_query = f"""
+            SELECT "{key_col}", {metric_sums}
+            FROM facts
+            WHERE "{self._date_col}" BETWEEN ? AND ?
+            AND "{key_col}" IS NOT NULL
+            {area_filter}
+            GROUP BY "{key_col}"
+            {limit_clause}
+            ORDER BY "{key_col}"
+        """
+        cursor = self._cursor()
+        try:
+            return cursor.execute(totals_query, [start_date, end_date, *area_params]).df()
+        finally:
+            cursor.close()
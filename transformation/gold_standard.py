@@ -3,32 +3,13 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from snowflake.snowpark import Session
-from snowflake.snowpark.context import get_active_session
 from snowflake.snowpark.functions import col
+from transformation.snowflake_session import run_query
+from transformation.snapshot_cache import snapshot_cache
 
-# Function to create a Snowflake session
-@st.cache_resource
-def create_snowflake_session():
-    try:
-        return get_active_session()
-    except:
-        connection_parameters = {
-            "account": st.secrets["snowflake"]["account"],
-            "user": st.secrets["snowflake"]["user"],
-            "password": st.secrets["snowflake"]["password"],
-            "role": st.secrets["snowflake"]["role"],
-            "warehouse": st.secrets["snowflake"]["warehouse"],
-            "database": st.secrets["snowflake"]["database"],
-            "schema": st.secrets["snowflake"]["schema"],
-        }
-        return Session.builder.configs(connection_parameters).create()
-
-@st.cache_data(ttl=600)
+@snapshot_cache('gs_query', ttl=600)
 def gs_query():
 
-    session = create_snowflake_session()
-
     gs_query = """
         SELECT MAX(IFNULL("opportunities.current_month_sales_calc", 0) + IFNULL("opportunities.current_month_assists", 0)) current_month_sales_and_assists, MAX(IFNULL("opportunities.previous_month_sales_calc", 0) + IFNULL("opportunities.previous_month_assists", 0)) previous_month_sales_and_assists, "user.name" name, "team_members.effective_date" date, IFNULL("user.picture_link", 'https://res.cloudinary.com/dwuzrptk6/image/upload/v1730865202/Group_1127_zhbvez.png') picture_link, 8 GOAL
         FROM analytics.reporting.tbl_team_members
@@ -36,4 +17,4 @@ def gs_query():
         GROUP BY ALL
         QUALIFY ROW_NUMBER() OVER(PARTITION BY "user.name" ORDER BY "team_members.effective_date" DESC) = 1
     """
-    return session.sql(gs_query).to_pandas()
\ No newline at end of file
+    return run_query(gs_query)
\ No newline at end of file
@@ -0,0 +1,265 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from PIL import Image
+
+from transformation.perf import instrumented
+
+# Profile and area pictures are downloaded once, shrunk to the size the cards and tables draw them
+# at and handed to the page as inline data URIs, instead of every client fetching the full-size
+# Cloudinary PNG on every rerun. Thumbnails are keyed on a hash of the downloaded picture, so links
+# that point at the same picture share one entry.
+
+# Thumbnails written here are shared by every process on the box (and survive restarts)
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join(".cache", "images"))
+
+# Thumbnails on disk nobody has read for this long are deleted when a process starts (and every
+# IMAGE_PURGE_INTERVAL seconds after, from the prefetcher), and the least recently read go first
+# while the directory is over IMAGE_CACHE_MAX_BYTES
+IMAGE_CACHE_MAX_AGE = 7 * 24 * 3600
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+IMAGE_PURGE_INTERVAL = 3600
+
+# (link, size) pairs kept in memory (least recently used are dropped first)
+IMAGE_CACHE_ENTRIES = int(os.environ.get("IMAGE_CACHE_ENTRIES", "512"))
+
+# Pixels per CSS pixel in a thumbnail; raise for high-density displays
+IMAGE_SCALE = int(os.environ.get("IMAGE_SCALE", "1"))
+
+IMAGE_FETCH_TIMEOUT = 5
+IMAGE_FETCH_WORKERS = 8
+
+# Links come from warehouse rows, so only https links on these hosts are downloaded
+IMAGE_HOSTS = tuple(host.strip() for host in os.environ.get("IMAGE_HOSTS", "res.cloudinary.com").split(",") if host.strip())
+
+# Local pictures (paths or file:// links) are read only from under this directory, e.g. test
+# fixtures; unset, no local file is ever opened
+IMAGE_FIXTURE_DIR = os.environ.get("IMAGE_FIXTURE_DIR")
+
+# A link that failed to download is shown as-is (hotlinked) and retried after this long
+IMAGE_RETRY_AFTER = 300
+
+class _AllowedHostRedirects(urllib.request.HTTPRedirectHandler):
+    # Follow redirects only to other allowed https links
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if not _allowed_url(newurl):
+            raise urllib.error.HTTPError(newurl, code, f"redirect to a disallowed link: {newurl}", headers, fp)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+_opener = urllib.request.build_opener(_AllowedHostRedirects)
+
+def _allowed_url(link):
+    parsed = urllib.parse.urlsplit(link)
+    return parsed.scheme == "https" and parsed.hostname in IMAGE_HOSTS
+
+def _fixture_path(link, fixture_dir):
+    # The local file a path or file:// link names, if it is inside fixture_dir
+    if not fixture_dir:
+        return None
+    parsed = urllib.parse.urlsplit(link)
+    if parsed.scheme == "file":
+        path = urllib.request.url2pathname(parsed.path)
+    elif parsed.scheme == "" or os.path.isabs(link):
+        path = link
+    else:
+        return None
+    root = os.path.realpath(fixture_dir)
+    path = os.path.realpath(path)
+    return path if os.path.commonpath([root, path]) == root else None
+
+def read_image(link, fixture_dir=None):
+    # Bytes of a picture: an https link on IMAGE_HOSTS, or a file under the fixture directory
+    # (IMAGE_FIXTURE_DIR unless given). Anything else raises, and the cache shows the link as-is.
+    path = _fixture_path(link, fixture_dir or IMAGE_FIXTURE_DIR)
+    if path is not None:
+        with open(path, "rb") as f:
+            return f.read()
+    if not _allowed_url(link):
+        raise ValueError(f"not an allowed picture link: {link}")
+    with _opener.open(link, timeout=IMAGE_FETCH_TIMEOUT) as response:
+        return response.read()
+
+def thumbnail_png(data, size):
+    # Fit the picture in a size × size box (keeping its aspect ratio and transparency)
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGBA")
+        image.thumbnail((size * IMAGE_SCALE, size * IMAGE_SCALE), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+def data_uri(png):
+    return "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+
+class ImageCache:
+    def __init__(self, fetch=read_image, cache_dir=IMAGE_CACHE_DIR, max_entries=IMAGE_CACHE_ENTRIES,
+                 max_age=IMAGE_CACHE_MAX_AGE, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        self._fetch = fetch
+        self._cache_dir = cache_dir
+        self._max_entries = max_entries
+        self._max_age = max_age
+        self._max_bytes = max_bytes
+        self.purge()
+        self._lock = threading.Lock()
+        self._links = OrderedDict()  # (link, size) -> content key
+        self._thumbnails = {}        # content key -> data URI
+        self._refs = Counter()       # content key -> links pointing at it
+        self._failed = {}            # link -> time of the last failed download
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def purge(self):
+        # Thumbnails (and temp files of crashed writes) older than max_age, then the oldest
+        # of the rest until the directory fits in max_bytes
+        self._purged_at = time.time()
+        try:
+            entries = [entry for entry in os.scandir(self._cache_dir) if entry.name.endswith((".png", ".tmp"))]
+        except OSError:
+            return
+        files = []
+        cutoff = self._purged_at - self._max_age
+        for entry in entries:
+            try:
+                stat = entry.stat()
+                if stat.st_mtime < cutoff:
+                    os.remove(entry.path)
+                else:
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError:
+                pass
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def purge_if_due(self, interval=IMAGE_PURGE_INTERVAL):
+        if time.time() - self._purged_at >= interval:
+            self.purge()
+
+    def _disk_path(self, link, size):
+        name = hashlib.sha256(link.encode()).hexdigest()[:16]
+        return os.path.join(self._cache_dir, f"{name}-{size * IMAGE_SCALE}.png")
+
+    def _load(self, link, size):
+        # (content key, data URI) from the disk cache, or downloaded and shrunk
+        path = self._disk_path(link, size)
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+        except OSError:
+            png = thumbnail_png(self._fetch(link), size)
+            os.makedirs(self._cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png)
+            os.replace(tmp_path, path)
+        else:
+            try:
+                os.utime(path)  # Still in use: keep it out of the next purge
+            except OSError:
+                pass
+        return hashlib.sha256(png).hexdigest(), data_uri(png)
+
+    def _store(self, link, size, key, uri):
+        with self._lock:
+            if (link, size) in self._links:
+                return
+            self._links[(link, size)] = key
+            self._thumbnails.setdefault(key, uri)
+            self._refs[key] += 1
+            while len(self._links) > self._max_entries:
+                _, old_key = self._links.popitem(last=False)
+                self._refs[old_key] -= 1
+                if not self._refs[old_key]:
+                    del self._refs[old_key], self._thumbnails[old_key]
+
+    def _cached(self, link, size):
+        # Data URI if cached, the link itself if it failed recently, else None
+        with self._lock:
+            key = self._links.get((link, size))
+            if key is not None:
+                self._links.move_to_end((link, size))
+                self.hits += 1
+                return self._thumbnails[key]
+            if time.time() - self._failed.get(link, float("-inf")) < IMAGE_RETRY_AFTER:
+                return link
+            self.misses += 1
+            return None
+
+    def _resolve(self, link, size):
+        try:
+            key, uri = self._load(link, size)
+        except Exception:
+            # Unreachable or not a picture: let the browser try the original link
+            with self._lock:
+                self._failed[link] = time.time()
+                self.failures += 1
+            return link
+        self._store(link, size, key, uri)
+        with self._lock:
+            self._failed.pop(link, None)
+        return uri
+
+    def thumbnail(self, link, size):
+        # Data URI for link drawn at size CSS pixels; empty links and data URIs pass through
+        if not isinstance(link, str) or not link or link.startswith("data:"):
+            return link
+        cached = self._cached(link, size)
+        return cached if cached is not None else self._resolve(link, size)
+
+    def thumbnails(self, links, size):
+        # thumbnail() for a column of links; distinct misses are downloaded in parallel
+        links = list(links)
+        resolved = {}
+        missing = []
+        for link in dict.fromkeys(links):
+            if not isinstance(link, str) or not link or link.startswith("data:"):
+                resolved[link] = link
+                continue
+            cached = self._cached(link, size)
+            if cached is None:
+                missing.append(link)
+            else:
+                resolved[link] = cached
+        if missing:
+            with ThreadPoolExecutor(min(IMAGE_FETCH_WORKERS, len(missing))) as executor:
+                resolved.update(zip(missing, executor.map(lambda link: self._resolve(link, size), missing)))
+        return [resolved[link] for link in links]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "links": len(self._links),
+                "thumbnails": len(self._thumbnails),
+                "hits": self.hits,
+                "misses": self.misses,
+                "failures": self.failures,
+            }
+
+@st.cache_resource
+def get_image_cache():
+    # One cache per process, shared by every session
+    return ImageCache()
+
+def thumbnail(link, size):
+    return get_image_cache().thumbnail(link, size)
+
+@instrumented("images.thumbnails")
+def thumbnails(links, size):
+    return get_image_cache().thumbnails(links, size)
@@ -0,0 +1,148 @@
+import threading
+import time
+import pandas as pd
+from transformation.snapshot_cache import get_snapshot_store, shared_frame
+from transformation.arrow_frames import concat_frames, same_rows
+from transformation.perf import timed, frame_size
+
+# How often a cached frame picks up new rows, and how often it is rebuilt from scratch
+# (the full reconcile catches late-arriving rows below the watermark, edits and deletes).
+REFRESH_TTL = 600
+RECONCILE_TTL = 6 * 3600
+
+def _bind_value(value):
+    # Snowflake bind variables want plain Python datetimes, not pandas Timestamps
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+# Last fetched frame plus a high-water mark on a date/timestamp column.
+# fetch(since) must return every row when since is None, otherwise only rows with
+# watermark_col >= since. Rows at the watermark are re-fetched and replaced, so a
+# refresh never double-counts a row that was already loaded.
+# With a snapshot_key the frame is also persisted to the shared Parquet snapshot store, and a
+# cold process starts from that snapshot while a background refresh fetches the newer rows.
+class IncrementalFrame:
+    def __init__(self, fetch, watermark_col, trim=None, ttl=REFRESH_TTL, reconcile_ttl=RECONCILE_TTL, snapshot_key=None):
+        self._fetch = fetch
+        self._watermark_col = watermark_col
+        self._trim = trim
+        self._ttl = ttl
+        self._reconcile_ttl = reconcile_ttl
+        self._snapshot_key = snapshot_key
+        # Stage name in the perf log: the query name from the snapshot key
+        self.name = snapshot_key.rsplit("-", 1)[0] if snapshot_key else "incremental"
+        self._lock = threading.Lock()
+        self._frame = None
+        self._watermark = None
+        self._refreshed_at = 0.0
+        self._reconciled_at = 0.0
+        self.version = 0
+
+    def get(self):
+        with timed(f"cache.{self.name}") as sample:
+            sample["cache"] = self._ensure_fresh()
+            sample["rows"] = len(self._frame)
+        return shared_frame(self._frame)
+
+    def current_version(self):
+        # Version of the frame get() would return now (refreshing first if the TTL ran out)
+        self._ensure_fresh()
+        return self.version
+
+    def expires_in(self):
+        # Seconds until get() would refresh; 0 when nothing has been loaded yet
+        if self._frame is None:
+            return 0.0
+        return self._refreshed_at + self._ttl - time.monotonic()
+
+    def refresh(self):
+        # Pick up new rows now instead of on the next expired get() (used by the prefetcher)
+        if self._frame is None and self._snapshot_key is not None:
+            self._load_snapshot()
+        with self._lock:
+            self._update(force=True)
+
+    def invalidate(self):
+        # Force a full reconcile on the next get(). The clocks are monotonic (counting from boot),
+        # so "long ago" has to be -inf rather than 0.
+        with self._lock:
+            self._reconciled_at = float("-inf")
+            self._refreshed_at = float("-inf")
+
+    def _ensure_fresh(self):
+        # "hit", "miss" (nothing loaded yet) or "refresh" (the TTL ran out), for the perf log
+        if self._frame is None and self._snapshot_key is not None:
+            self._load_snapshot()
+        if self._frame is None or time.monotonic() - self._refreshed_at >= self._ttl:
+            outcome = "miss" if self._frame is None else "refresh"
+            with self._lock:
+                self._update()
+            return outcome
+        return "hit"
+
+    def _update(self, force=False):
+        # Caller holds the lock. Another script run may have refreshed while we waited for it.
+        now = time.monotonic()
+        if self._frame is None or now - self._reconciled_at >= self._reconcile_ttl:
+            self._reconcile()
+        elif force or now - self._refreshed_at >= self._ttl:
+            self._refresh()
+
+    def _load_snapshot(self):
+        with self._lock:
+            if self._frame is not None:
+                return
+            loaded = get_snapshot_store().load(self._snapshot_key)
+            if loaded is None:
+                return
+            frame, fetched_at = loaded
+            # Readers get the snapshot right away; the reconcile clock keeps its real age
+            self._swap(frame, persist=False)
+            self._reconciled_at = time.monotonic() - max(time.time() - fetched_at, 0.0)
+        threading.Thread(target=self._background_update, name="incremental-refresh", daemon=True).start()
+
+    def _background_update(self):
+        try:
+            with self._lock:
+                self._update(force=True)
+        except Exception:
+            pass  # Keep serving the snapshot; the next get() after the TTL retries
+
+    def _reconcile(self):
+        with timed(f"fetch.{self.name}.full") as sample:
+            frame = self._fetch(None)
+            sample["rows"], sample["nbytes"] = frame_size(frame)
+        self._swap(frame)
+        self._reconciled_at = self._refreshed_at
+
+    def _refresh(self):
+        if self._watermark is None:
+            self._reconcile()
+            return
+        with timed(f"fetch.{self.name}.delta") as sample:
+            delta = self._fetch(_bind_value(self._watermark))
+            sample["rows"], sample["nbytes"] = frame_size(delta)
+        at_or_above = self._frame[self._watermark_col] >= self._watermark
+        if same_rows(delta, self._frame[at_or_above]):
+            trimmed = self._trim(self._frame) if self._trim is not None else self._frame
+            if len(trimmed) == len(self._frame):
+                # Nothing new and nothing aged out: keep the same frame and version
+                self._refreshed_at = time.monotonic()
+                return
+            self._swap(trimmed)
+            return
+        # Keep rows below the watermark (and rows with no date); replace everything at or above it
+        self._swap(concat_frames([self._frame[~at_or_above], delta]))
+
+    def _swap(self, frame, persist=True):
+        if self._trim is not None:
+            frame = self._trim(frame)
+        frame = frame.reset_index(drop=True)
+        watermark = frame[self._watermark_col].max() if not frame.empty else None
+        self._watermark = None if pd.isna(watermark) else watermark
+        self._frame = frame
+        self._refreshed_at = time.monotonic()
+        self.version += 1
+        if persist and self._snapshot_key is not None:
+            get_snapshot_store().save(self._snapshot_key, frame)
@@ -3,49 +3,97 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from snowflake.snowpark import Session
-from snowflake.snowpark.context import get_active_session
 from snowflake.snowpark.functions import col
+from transformation.snowflake_session import run_query
+from transformation.snapshot_cache import snapshot_cache
+from transformation.derived_cache import derived_cache
+from transformation.query_params import in_clause
+from transformation.dimensions import key_sql
 
-# Function to create a Snowflake session
-@st.cache_resource
-def create_snowflake_session():
-    try:
-        return get_active_session()
-    except:
-        connection_parameters = {
-            "account": st.secrets["snowflake"]["account"],
-            "user": st.secrets["snowflake"]["user"],
-            "password": st.secrets["snowflake"]["password"],
-            "role": st.secrets["snowflake"]["role"],
-            "warehouse": st.secrets["snowflake"]["warehouse"],
-            "database": st.secrets["snowflake"]["database"],
-            "schema": st.secrets["snowflake"]["schema"],
-        }
-        return Session.builder.configs(connection_parameters).create()
-
-@st.cache_data(ttl=600)
-def leaderboard_query():
-
-    session = create_snowflake_session()
-
-    leaderboard_query = """
-        SELECT date "Date", closer "Closer", closer_picture_link "Closer Picture Link", area "Area", area_picture_link "Area Picture Link",COUNT(DISTINCT CASE WHEN metric = 'Sales' THEN id END) "Sales", COUNT(DISTINCT CASE WHEN metric = 'Sits' THEN id END) "Sits", COUNT(DISTINCT CASE WHEN metric = 'Opportunities' THEN id END) "Opps"
+@snapshot_cache('leaderboard_areas', ttl=600)
+def leaderboard_areas_frame():
+
+    areas_query = """
+        SELECT DISTINCT area "Area"
+FROM analytics.team_reporting.dtbl_sales_leaderboard
+WHERE area IS NOT NULL
+ORDER BY "Area"
+    """
+    return run_query(areas_query)
+
+def leaderboard_areas():
+    return leaderboard_areas_frame()["Area"].tolist()
+
+def leaderboard_sql(start_date, end_date, areas=()):
+
+    area_filter, area_params = in_clause("area", areas)
+
+    leaderboard_query = f"""
+        SELECT date "Date", {key_sql('closer')} "Closer Key", {key_sql('area')} "Area Key", COUNT(DISTINCT CASE WHEN metric = 'Sales' THEN id END) "Sales", COUNT(DISTINCT CASE WHEN metric = 'Sits' THEN id END) "Sits", COUNT(DISTINCT CASE WHEN metric = 'Opportunities' THEN id END) "Opps"
 FROM analytics.team_reporting.dtbl_sales_leaderboard
+WHERE date BETWEEN ? AND ?
+{area_filter}
 GROUP BY ALL
     """
-    return session.sql(leaderboard_query).to_pandas()
+    return leaderboard_query, [start_date, end_date, *area_params]
 
-@st.cache_data(ttl=600)
-def fm_leaderboard_query():
+def fm_leaderboard_sql(start_date, end_date, areas=()):
 
-    session = create_snowflake_session()
+    area_filter, area_params = in_clause("area", areas)
 
-    fm_leaderboard_query = """
-        SELECT date "Date", lead_generator "FM", area "Area", fm_picture_link "FM Picture Link", area_picture_link "Area Picture Link", COUNT(DISTINCT CASE WHEN metric = 'Sales' THEN id END) "Assists", COUNT(DISTINCT CASE WHEN metric = 'Sits' THEN id END) "Sits", COUNT(DISTINCT CASE WHEN metric = 'Sets' THEN id END) "Sets"
+    fm_leaderboard_query = f"""
+        SELECT date "Date", {key_sql('lead_generator')} "FM Key", {key_sql('area')} "Area Key", COUNT(DISTINCT CASE WHEN metric = 'Sales' THEN id END) "Assists", COUNT(DISTINCT CASE WHEN metric = 'Sits' THEN id END) "Sits", COUNT(DISTINCT CASE WHEN metric = 'Sets' THEN id END) "Sets"
 FROM analytics.team_reporting.dtbl_sales_leaderboard
 WHERE lead_generator IS NOT NULL
+AND date BETWEEN ? AND ?
+{area_filter}
 GROUP BY ALL
 ORDER BY "Assists"
     """
-    return session.sql(fm_leaderboard_query).to_pandas()
\ No newline at end of file
+    return fm_leaderboard_query, [start_date, end_date, *area_params]
+
+# The Energy Consultant and Field Marketer facts come from one scan of the leaderboard table:
+# GROUPING SETS returns the (date, closer, area) rows and the (date, lead_generator, area) rows
+# together, each with its own distinct counts (the same numbers leaderboard_sql and
+# fm_leaderboard_sql give), and "Grouping" tells them apart. Both boards cost one round trip.
+
+# GROUPING(closer, lead_generator) of each set's rows
+EC_GROUPING = 1
+FM_GROUPING = 2
+
+def leaderboard_facts_sql(start_date, end_date, areas=()):
+
+    area_filter, area_params = in_clause("area", areas)
+
+    leaderboard_facts_query = f"""
+        SELECT date "Date", {key_sql('closer')} "Closer Key", {key_sql('lead_generator')} "FM Key", {key_sql('area')} "Area Key", GROUPING(closer, lead_generator) "Grouping", COUNT(DISTINCT CASE WHEN metric = 'Sales' THEN id END) "Sales", COUNT(DISTINCT CASE WHEN metric = 'Sits' THEN id END) "Sits", COUNT(DISTINCT CASE WHEN metric = 'Opportunities' THEN id END) "Opps", COUNT(DISTINCT CASE WHEN metric = 'Sets' THEN id END) "Sets"
+FROM analytics.team_reporting.dtbl_sales_leaderboard
+WHERE date BETWEEN ? AND ?
+{area_filter}
+GROUP BY GROUPING SETS ((date, closer, area), (date, lead_generator, area))
+HAVING GROUPING(lead_generator) = 1 OR lead_generator IS NOT NULL
+    """
+    return leaderboard_facts_query, [start_date, end_date, *area_params]
+
+@snapshot_cache('leaderboard_facts', ttl=600)
+def leaderboard_facts(start_date, end_date, areas=()):
+
+    leaderboard_facts_query, params = leaderboard_facts_sql(start_date, end_date, areas)
+    return run_query(leaderboard_facts_query, params)
+
+def _facts_version(start_date, end_date, areas=()):
+    return (leaderboard_facts.cache.current_version(start_date, end_date, areas),)
+
+@derived_cache(_facts_version, max_entries=8)
+def leaderboard_query(start_date, end_date, areas=()):
+    # Energy Consultant facts, the same frame a query of leaderboard_sql returns
+    facts = leaderboard_facts(start_date, end_date, areas)
+    facts = facts[facts["Grouping"] == EC_GROUPING]
+    return facts[["Date", "Closer Key", "Area Key", "Sales", "Sits", "Opps"]].reset_index(drop=True)
+
+@derived_cache(_facts_version, max_entries=8)
+def fm_leaderboard_query(start_date, end_date, areas=()):
+    # Field Marketer facts, the same frame a query of fm_leaderboard_sql returns (unordered)
+    facts = leaderboard_facts(start_date, end_date, areas)
+    facts = facts[facts["Grouping"] == FM_GROUPING].rename(columns={"Sales": "Assists"})
+    return facts[["Date", "FM Key", "Area Key", "Assists", "Sits", "Sets"]].reset_index(drop=True)
@@ -0,0 +1,236 @@
+import datetime
+import os
+import pandas as pd
+from transformation.snowflake_session import run_query
+from transformation.snapshot_cache import snapshot_cache
+from transformation.derived_cache import derived_cache
+from transformation.perf import instrumented
+from transformation.range_index import PrefixSumIndex
+from transformation.duckdb_engine import FactsDatabase, duckdb_available
+from transformation.leaderboard import leaderboard_sql, fm_leaderboard_sql, leaderboard_query, fm_leaderboard_query, leaderboard_facts
+from transformation.contract_value_leaderboard import cv_sql, cv_cache
+from transformation.dimensions import rep_dimension, area_dimension, attach_dimension, area_keys, DEFAULT_PICTURE
+
+# "local" answers date ranges inside the history window from in-memory prefix-sum indexes over the
+# cached facts; "duckdb" runs them as SQL over the same facts loaded into an in-process DuckDB database
+# (falls back to "local" when duckdb is not installed); "snowflake" runs one GROUP BY per selection.
+# Ranges outside the window, and area filters naming an area the dimension has no key for, always
+# go to Snowflake.
+LEADERBOARD_ENGINE = os.environ.get("LEADERBOARD_ENGINE", "local")
+
+# Whole months of facts (including the current one) kept for the local engine
+HISTORY_MONTHS = int(os.environ.get("LEADERBOARD_HISTORY_MONTHS", "13"))
+
+# Rows per leaderboard table page; the rest are rolled into one "Others" row. 0 shows every row.
+LEADERBOARD_TOP_N = int(os.environ.get("LEADERBOARD_TOP_N", "50"))
+
+# Each board is a fact query plus the metrics it can sum.
+# Dimensions map to (key column in the facts, dimension table, name column, picture column).
+LEADERBOARDS = {
+    "Energy Consultant": {
+        "sql": leaderboard_sql,
+        "facts": lambda start_date, end_date: leaderboard_query(start_date, end_date, ()),
+        "version": lambda start_date, end_date: leaderboard_facts.cache.current_version(start_date, end_date, ()),
+        "date": "Date",
+        "metrics": ["Sales", "Sits", "Opps"],
+        "dimensions": {
+            "Rep": ("Closer Key", rep_dimension, "Closer", "Closer Picture Link"),
+            "Area": ("Area Key", area_dimension, "Area", "Area Picture Link"),
+        },
+    },
+    "Field Marketer": {
+        "sql": fm_leaderboard_sql,
+        "facts": lambda start_date, end_date: fm_leaderboard_query(start_date, end_date, ()),
+        "version": lambda start_date, end_date: leaderboard_facts.cache.current_version(start_date, end_date, ()),
+        "date": "Date",
+        "metrics": ["Assists", "Sits", "Sets"],
+        "dimensions": {
+            "Rep": ("FM Key", rep_dimension, "FM", "FM Picture Link"),
+            "Area": ("Area Key", area_dimension, "Area", "Area Picture Link"),
+        },
+    },
+    "Contract Value": {
+        "sql": cv_sql,
+        "facts": lambda start_date, end_date: cv_cache(start_date, end_date, ()).get(),
+        "version": lambda start_date, end_date: cv_cache(start_date, end_date, ()).current_version(),
+        "date": "Sale Date",
+        "metrics": ["CV", "Solar", "Batteries", "Roofs", "Bundled"],
+        "dimensions": {
+            "Rep": {
+                "Energy Consultant": ("Closer Key", rep_dimension, "Closer", "Closer Picture Link"),
+                "Field Marketer": ("Field Marketer Key", rep_dimension, "Field Marketer", "FM Picture Link"),
+            },
+            "Area": ("Area Key", area_dimension, "Area", "Area Picture Link"),
+        },
+    },
+}
+
+def _dimension(board, role, dimension):
+    columns = LEADERBOARDS[board]["dimensions"][dimension]
+    if isinstance(columns, dict):
+        columns = columns[role]
+    return columns
+
+def leaderboard_columns(board, role, dimension):
+    # Returns (name column, picture column, metrics) for a board/role/dimension selection
+    _, _, name_col, picture_col = _dimension(board, role, dimension)
+    return name_col, picture_col, LEADERBOARDS[board]["metrics"]
+
+def aggregation_sql(board, role, dimension, start_date, end_date, areas=(), limit=None):
+    key_col, _, _, _ = _dimension(board, role, dimension)
+    metrics = LEADERBOARDS[board]["metrics"]
+    facts_query, params = LEADERBOARDS[board]["sql"](start_date, end_date, areas)
+
+    metric_sums = ", ".join(f'SUM("{metric}") "{metric}"' for metric in metrics)
+    # The top `limit` plus every row tied with the last one; the caller breaks ties by name
+    limit_clause = f'QUALIFY RANK() OVER (ORDER BY SUM("{metrics[0]}") DESC NULLS LAST) <= {int(limit)}' if limit else ""
+
+    # Rows without a rep/area are skipped, same as the pandas groupby this replaces
+    aggregation_query = f"""
+        WITH facts AS ({facts_query})
+        SELECT "{key_col}", {metric_sums}
+        FROM facts
+        WHERE "{key_col}" IS NOT NULL
+        GROUP BY "{key_col}"
+        {limit_clause}
+        ORDER BY "{metrics[0]}" DESC NULLS LAST, "{key_col}"
+    """
+    return aggregation_query, params
+
+@snapshot_cache('leaderboard_totals', ttl=600)
+def leaderboard_totals(board, role, dimension, start_date, end_date, areas=(), limit=None):
+    # One GROUP BY in Snowflake; only the ranked keys and their sums come back
+    aggregation_query, params = aggregation_sql(board, role, dimension, start_date, end_date, areas, limit)
+    return run_query(aggregation_query, params)
+
+def history_window(today=None):
+    # First day HISTORY_MONTHS - 1 months back through the end of the current month.
+    # Only moves at month boundaries, so the cached facts keep the same key all month.
+    today = today or datetime.date.today()
+    first = today.replace(day=1)
+    for _ in range(HISTORY_MONTHS - 1):
+        first = (first - datetime.timedelta(days=1)).replace(day=1)
+    next_month = (today.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return first, next_month - datetime.timedelta(days=1)
+
+@derived_cache(lambda board, key_col, history_start, history_end: (
+    LEADERBOARDS[board]["version"](history_start, history_end),
+), max_entries=8)
+def board_index(board, key_col, history_start, history_end):
+    # Prefix sums of every metric per (rep or area, area), rebuilt when the facts refresh
+    spec = LEADERBOARDS[board]
+    facts = spec["facts"](history_start, history_end)
+    return PrefixSumIndex(facts[spec["date"]], facts[key_col], facts["Area Key"], facts[spec["metrics"]])
+
+@instrumented("leaderboard.local_totals")
+def local_leaderboard_totals(board, role, dimension, start_date, end_date, areas=(), limit=None):
+    # Same frame as leaderboard_totals, answered from the in-memory index
+    key_col, _, _, _ = _dimension(board, role, dimension)
+    metrics = LEADERBOARDS[board]["metrics"]
+    index = board_index(board, key_col, *history_window())
+
+    area_codes = None
+    if areas:
+        area_codes = index.area_codes(area_keys(areas))
+
+    keys, _, sums = index.totals(start_date, end_date, area_codes)
+    totals = pd.DataFrame(sums, columns=metrics)
+    totals.insert(0, key_col, keys)
+
+    # Sums come back as floats; keep integer metrics integers like SUM() in Snowflake
+    for metric, is_integer in zip(metrics, index.integer_metrics):
+        if is_integer:
+            totals[metric] = totals[metric].round().astype("int64")
+    # Rows come back in key order; the caller ranks them. With a limit, rows tied with the last
+    # one are kept too, as in the SQL engines
+    return (totals.nlargest(int(limit), metrics[0], keep="all") if limit else totals).reset_index(drop=True)
+
+def _key_columns(board):
+    # Every rep/area key column a board can be grouped by
+    keys = []
+    for columns in LEADERBOARDS[board]["dimensions"].values():
+        keys += [key_col for key_col, *_ in (columns.values() if isinstance(columns, dict) else [columns])]
+    return list(dict.fromkeys(keys))
+
+@derived_cache(lambda board, history_start, history_end: (
+    LEADERBOARDS[board]["version"](history_start, history_end),
+), max_entries=4)
+def board_database(board, history_start, history_end):
+    # A board's facts in DuckDB (every dimension of it), reloaded when the facts refresh
+    spec = LEADERBOARDS[board]
+    facts = spec["facts"](history_start, history_end)
+    return FactsDatabase(facts, spec["date"], _key_columns(board), spec["metrics"])
+
+@instrumented("leaderboard.duckdb_totals")
+def duckdb_leaderboard_totals(board, role, dimension, start_date, end_date, areas=(), limit=None):
+    # Same frame as leaderboard_totals, answered by SQL over the facts in DuckDB
+    key_col, _, _, _ = _dimension(board, role, dimension)
+    database = board_database(board, *history_window())
+    keys = area_keys(areas) if areas else None
+    return database.totals(key_col, LEADERBOARDS[board]["metrics"], start_date, end_date, keys, limit)
+
+def use_local_engine(start_date, end_date):
+    # True when the selection is answered in-process from the history facts
+    history_start, history_end = history_window()
+    return LEADERBOARD_ENGINE in ("local", "duckdb") and history_start <= start_date and end_date <= history_end
+
+def leaderboard_engine(start_date, end_date, areas=()):
+    # Engine that answers a selection: the in-process one for ranges inside the history window
+    # whose areas all have a key, else Snowflake
+    if not use_local_engine(start_date, end_date) or (areas and area_keys(areas) is None):
+        return "snowflake"
+    return "duckdb" if LEADERBOARD_ENGINE == "duckdb" and duckdb_available() else "local"
+
+# Copy of the key column kept through attach_dimension, to tell ranked rows apart
+RANK_KEY = "Rank Key"
+
+def rank_rows(totals, key_col, metric, dimension_table, name_col, picture_col, count=None):
+    # The first `count` rows in board order (metric descending, then name) with their names and
+    # pictures. nlargest(keep="all") picks the candidates in O(rows) and keeps every row tied with
+    # the last one, so the name decides ties at the cut; only the candidates are joined and sorted.
+    candidates = totals if count is None else totals.nlargest(count, metric, keep="all")
+    ranked = attach_dimension(
+        candidates.assign(**{RANK_KEY: candidates[key_col]}), key_col, dimension_table, name_col, picture_col
+    )
+    ranked = ranked.sort_values([metric, name_col], ascending=[False, True], na_position="last", kind="stable")
+    return ranked if count is None else ranked.iloc[:count]
+
+@instrumented("leaderboard.aggregate")
+def aggregate_leaderboard(board, role, dimension, start_date, end_date, areas=(), limit=None, top_n=None, page=1):
+    # Ranked totals with the rep/area name and picture joined back from the dimension table.
+    # With top_n, only that page of rows plus an "Others" row summing everything ranked below it;
+    # the page and page count are in .attrs.
+    key_col, dimension_table, name_col, picture_col = _dimension(board, role, dimension)
+    metrics = LEADERBOARDS[board]["metrics"]
+    engine = leaderboard_engine(start_date, end_date, areas)
+    if engine == "duckdb":
+        totals = duckdb_leaderboard_totals(board, role, dimension, start_date, end_date, areas, limit)
+    elif engine == "local":
+        totals = local_leaderboard_totals(board, role, dimension, start_date, end_date, areas, limit)
+    else:
+        totals = leaderboard_totals(board, role, dimension, start_date, end_date, areas, limit)
+
+    if limit:
+        # Every engine returns the rows tied at the limit too; ranking by name decides which stay
+        kept = rank_rows(totals, key_col, metrics[0], dimension_table, name_col, picture_col, int(limit))
+        totals = totals[totals[key_col].isin(kept[RANK_KEY])]
+
+    if top_n:
+        pages = max(1, -(-len(totals) // top_n))
+        page = min(max(int(page), 1), pages)
+        shown = rank_rows(totals, key_col, metrics[0], dimension_table, name_col, picture_col, page * top_n)
+        below = totals[~totals[key_col].isin(shown[RANK_KEY])]
+        ranked = shown.iloc[(page - 1) * top_n:]
+    else:
+        page, pages = 1, 1
+        ranked = rank_rows(totals, key_col, metrics[0], dimension_table, name_col, picture_col)
+        below = totals.iloc[:0]
+    ranked = ranked[[picture_col, name_col, *metrics]]
+    if len(below):
+        # Summed per column so integer metrics stay integers
+        others = {picture_col: [DEFAULT_PICTURE], name_col: [f"Others ({len(below)})"]}
+        others.update({metric: [below[metric].sum()] for metric in metrics})
+        ranked = pd.concat([ranked, pd.DataFrame(others)], ignore_index=True)
+    ranked = ranked.reset_index(drop=True)
+    ranked.attrs.update(page=page, pages=pages, total_rows=len(totals))
+    return ranked
@@ -0,0 +1,100 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Timings of queries, cache reads, transforms and rendering, kept in a ring buffer per process.
+# Stage names are dotted: snowflake.query / snowflake.to_pandas for every query, cache.<name> for
+# cache reads (with hit/miss/stale/refresh), fetch.<name> for the queries behind a cache,
+# derived.<function> for memoized transforms and cards.* / leaderboard.* / images.* for the pages.
+
+# Samples kept (oldest are dropped first)
+PERF_SAMPLES = int(os.environ.get("PERF_SAMPLES", "5000"))
+
+def frame_size(result):
+    # (rows, bytes) of a DataFrame or Arrow table, (None, None) for anything else
+    if isinstance(result, pd.DataFrame):
+        return len(result), int(result.memory_usage(index=False).sum())
+    if isinstance(result, pa.Table):
+        return result.num_rows, result.nbytes
+    return None, None
+
+class PerfLog:
+    def __init__(self, max_samples=PERF_SAMPLES):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=max_samples)
+
+    def record(self, stage, seconds, rows=None, nbytes=None, cache=None):
+        sample = {
+            "stage": stage,
+            "at": time.time(),
+            "seconds": seconds,
+            "rows": rows,
+            "bytes": nbytes,
+            "cache": cache,
+            "thread": threading.current_thread().name,
+        }
+        with self._lock:
+            self._samples.append(sample)
+
+    def samples(self):
+        with self._lock:
+            return list(self._samples)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        # One row per stage: call count, p50/p95/max latency, mean rows/bytes and cache hit rate
+        samples = pd.DataFrame(self.samples(), columns=["stage", "at", "seconds", "rows", "bytes", "cache", "thread"])
+        rows = []
+        for stage, group in samples.groupby("stage", sort=True):
+            milliseconds = group["seconds"].to_numpy(dtype=np.float64) * 1000
+            lookups = group["cache"].dropna()
+            rows.append({
+                "Stage": stage,
+                "Calls": len(group),
+                "p50 ms": np.percentile(milliseconds, 50),
+                "p95 ms": np.percentile(milliseconds, 95),
+                "Max ms": milliseconds.max(),
+                "Rows": pd.to_numeric(group["rows"], errors="coerce").mean(),
+                "KB": pd.to_numeric(group["bytes"], errors="coerce").mean() / 1024,
+                "Hit rate": (lookups == "hit").mean() if len(lookups) else np.nan,
+            })
+        return pd.DataFrame(rows, columns=["Stage", "Calls", "p50 ms", "p95 ms", "Max ms", "Rows", "KB", "Hit rate"])
+
+    def to_json(self):
+        # Every buffered sample, for offline analysis
+        return json.dumps(self.samples(), default=str)
+
+PERF_LOG = PerfLog()
+
+@contextmanager
+def timed(stage, **fields):
+    # with timed("stage") as sample: ...; sample["rows"] = len(df)  (rows, nbytes, cache)
+    sample = dict(fields)
+    start = time.perf_counter()
+    try:
+        yield sample
+    finally:
+        PERF_LOG.record(stage, time.perf_counter() - start, **sample)
+
+def instrumented(stage):
+    # Decorator: time every call as `stage`, with rows/bytes when it returns a frame
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage) as sample:
+                result = func(*args, **kwargs)
+                sample["rows"], sample["nbytes"] = frame_size(result)
+            return result
+        return wrapper
+    return decorator
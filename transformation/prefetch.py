@@ -0,0 +1,154 @@
+import datetime
+import threading
+import time
+import streamlit as st
+
+from transformation.snapshot_cache import SnapshotCache, get_snapshot_store
+from transformation.image_cache import get_image_cache
+from transformation.appointments_data import appointments_cache, LOCAL_TZ
+from transformation.sales_data import sales_cache, get_sales_pace
+from transformation.gold_standard import gs_query
+from transformation.leaderboard import leaderboard_areas_frame, leaderboard_facts
+from transformation.leaderboard_aggregation import leaderboard_totals, history_window, use_local_engine
+from transformation.contract_value_leaderboard import cv_cache
+from transformation.dimensions import rep_dimension, area_dimension
+
+# How often the scheduler wakes up, and how close to expiry an entry gets re-run.
+# The lead has to cover the slowest query so the new result lands before the old one expires.
+PREFETCH_INTERVAL = 30
+PREFETCH_LEAD = 120
+
+# Parameter sets a script run asked for within this window are kept warm alongside the defaults
+RECENT_WINDOW = 3600
+
+# Snapshot caches whose recently requested parameters are kept warm
+SNAPSHOT_CACHES = [
+    leaderboard_areas_frame.cache,
+    leaderboard_facts.cache,
+    leaderboard_totals.cache,
+    get_sales_pace.cache,
+    gs_query.cache,
+]
+
+def default_targets():
+    # (cache, args) for what each page shows before anyone touches the controls.
+    # Built on every pass so the month rolls over without a restart.
+    now = datetime.datetime.now(LOCAL_TZ)
+    targets = [
+        (appointments_cache(), ()),
+        (sales_cache(now.month, now.year), ()),
+        (get_sales_pace.cache, ()),
+        (gs_query.cache, ()),
+        (leaderboard_areas_frame.cache, ()),
+        (rep_dimension.cache, ()),
+        (area_dimension.cache, ()),
+    ]
+
+    # Leaderboards defaults to the current month (server date, same as the page) with no area filter
+    today = datetime.date.today()
+    next_month = (today.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    start_date, end_date = today.replace(day=1), next_month - datetime.timedelta(days=1)
+    if use_local_engine(start_date, end_date):
+        # The local engine answers every range from the history facts
+        history_start, history_end = history_window()
+        targets += [
+            (leaderboard_facts.cache, (history_start, history_end, ())),
+            (cv_cache(history_start, history_end, ()), ()),
+        ]
+        return targets
+    for role in ("Energy Consultant", "Field Marketer"):
+        for dimension in ("Rep", "Area"):
+            for board in (role, "Contract Value"):
+                targets.append((leaderboard_totals.cache, (board, role, dimension, start_date, end_date, ())))
+    return targets
+
+def prefetch_targets():
+    # Defaults plus anything someone looked at recently, each cache/parameter set once
+    targets = {}
+    for cache, args in default_targets():
+        targets[(id(cache), repr(args))] = (cache, args)
+    for cache in SNAPSHOT_CACHES:
+        for args in cache.recent_requests(RECENT_WINDOW):
+            targets.setdefault((id(cache), repr(args)), (cache, args))
+    return list(targets.values())
+
+# Daemon thread that re-runs cached queries shortly before they expire, so page reruns
+# always find a fresh result. Each refresh swaps the new frame in whole; readers keep the
+# old one until then.
+class PrefetchScheduler:
+    def __init__(self, targets=prefetch_targets, interval=PREFETCH_INTERVAL, lead=PREFETCH_LEAD):
+        self._targets = targets
+        self.interval = interval
+        self.lead = lead
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="prefetch", daemon=True)
+        self.passes = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_pass_at = None
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        try:
+            # Builds cache_resource entries (appointments_cache(), cv_cache(...)), which can raise too
+            targets = self._targets()
+        except Exception as error:
+            # Nothing to refresh this pass; the next one builds the targets again
+            targets = []
+            self._record_error("targets", error)
+        for cache, args in targets:
+            try:
+                if cache.expires_in(*args) > self.lead:
+                    continue
+                if isinstance(cache, SnapshotCache):
+                    # Reuse a snapshot another process already refreshed
+                    cache.refresh(*args, reuse_if_fresh_for=self.lead)
+                else:
+                    cache.refresh()
+                self.refreshes += 1
+            except Exception as error:
+                # Keep the stale entry; the next pass (or the next reader) retries
+                self._record_error(getattr(cache, 'name', type(cache).__name__), error)
+        # Keep the on-disk snapshots and thumbnails within their age and size limits
+        for source, purge in (("snapshots", lambda: get_snapshot_store().purge_if_due()),
+                              ("images", lambda: get_image_cache().purge_if_due())):
+            try:
+                purge()
+            except Exception as error:
+                self._record_error(source, error)
+        self.passes += 1
+        self.last_pass_at = time.time()
+
+    def _record_error(self, source, error):
+        self.errors += 1
+        self.last_error = f"{source}: {error}"
+
+    def stats(self):
+        return {
+            "passes": self.passes,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_pass_at": self.last_pass_at,
+        }
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as error:
+                # The thread must outlive any one pass, or the pages fall back to waiting on the TTL
+                self._record_error("pass", error)
+            self._stop.wait(self.interval)
+
+@st.cache_resource
+def start_prefetcher():
+    # One scheduler per server process, started by whichever page loads first
+    return PrefetchScheduler().start()
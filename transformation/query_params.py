@@ -0,0 +1,8 @@
+def in_clause(column, values):
+    # Build an "AND column IN (?, ?, ...)" filter with one bind variable per value.
+    # An empty selection means "no filter", matching how the pages treat an empty multiselect.
+    values = list(values or ())
+    if not values:
+        return "", []
+    placeholders = ", ".join("?" for _ in values)
+    return f"AND {column} IN ({placeholders})", values
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# Date-range totals per entity from cumulative sums. Rows are sorted by (entity, area, day) and
+# summed cumulatively, so the total of any group over [start, end] is cum[hi] - cum[lo], with lo/hi
+# from two searchsorted lookups. A query costs O(groups × log rows) whatever the history length.
+class PrefixSumIndex:
+    def __init__(self, days, entities, areas, values):
+        # days: datetime64 per row; entities/areas: keys per row (NaN entity rows are dropped,
+        # NaN areas only match when no area filter is given); values: rows × metrics
+        days = pd.to_datetime(pd.Series(days)).to_numpy().astype('datetime64[D]').astype(np.int64)
+        entity_codes, self.entities = pd.factorize(pd.Series(entities), sort=True)
+        area_codes, self.areas = pd.factorize(pd.Series(areas), sort=True)
+        values = pd.DataFrame(values)
+        # Integer metrics come back as integers from totals(); NULLs count as 0, like SUM() skipping them
+        self.integer_metrics = np.array([pd.api.types.is_integer_dtype(dtype) for dtype in values.dtypes])
+        values = values.to_numpy(dtype=np.float64, na_value=0.0)
+
+        keep = (entity_codes >= 0) & (days != np.iinfo(np.int64).min)
+        days, entity_codes, area_codes, values = days[keep], entity_codes[keep], area_codes[keep], values[keep]
+
+        # Rows with no area get their own code after the real ones
+        area_codes = np.where(area_codes < 0, len(self.areas), area_codes)
+        area_count = len(self.areas) + 1
+
+        self._first_day = int(days.min()) if len(days) else 0
+        self._span = int(days.max()) - self._first_day + 1 if len(days) else 1
+
+        groups = entity_codes.astype(np.int64) * area_count + area_codes
+        order = np.lexsort((days, groups))
+        groups, days, values = groups[order], days[order], values[order]
+
+        # Composite (group, day) keys are sorted, so one searchsorted covers every group at once
+        self._composite = groups * self._span + (days - self._first_day)
+        self._group_ids = np.unique(groups)
+        self._group_entity = self._group_ids // area_count
+        self._group_area = self._group_ids % area_count
+        self._cum = np.zeros((len(values) + 1, values.shape[1] if values.ndim == 2 else 0))
+        np.cumsum(values, axis=0, out=self._cum[1:])
+
+    def area_codes(self, area_keys):
+        # Precomputed codes for an area filter (unknown keys match nothing)
+        return self.areas.get_indexer(pd.Index(area_keys))
+
+    def totals(self, start_date, end_date, area_codes=None):
+        # (entity keys, row counts, sums) per entity with rows in [start_date, end_date]
+        start = int(np.datetime64(start_date, 'D').astype(np.int64)) - self._first_day
+        end = int(np.datetime64(end_date, 'D').astype(np.int64)) - self._first_day
+        start, end = max(start, 0), min(end, self._span - 1)
+        metric_count = self._cum.shape[1]
+        if end < start or not len(self._group_ids):
+            return self.entities[:0], np.zeros(0, dtype=np.int64), np.zeros((0, metric_count))
+
+        base = self._group_ids * self._span
+        lo = np.searchsorted(self._composite, base + start, side='left')
+        hi = np.searchsorted(self._composite, base + end, side='right')
+        rows = hi - lo
+        sums = self._cum[hi] - self._cum[lo]
+        group_entity = self._group_entity
+        if area_codes is not None:
+            selected = np.isin(self._group_area, np.asarray(area_codes))
+            rows, sums, group_entity = rows[selected], sums[selected], group_entity[selected]
+
+        # Groups -> entities
+        entity_rows = np.bincount(group_entity, weights=rows, minlength=len(self.entities))
+        entity_sums = np.zeros((len(self.entities), metric_count))
+        np.add.at(entity_sums, group_entity, sums)
+        active = entity_rows > 0
+        return self.entities[active], entity_rows[active].astype(np.int64), entity_sums[active]
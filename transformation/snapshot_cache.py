@@ -0,0 +1,292 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from transformation.perf import timed, frame_size
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, atomic renames still keep readers safe
+    fcntl = None
+
+# Parquet snapshots shared by every Streamlit process on the box (and across restarts)
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_CACHE_DIR", os.path.join(".cache", "snapshots"))
+
+# Snapshots nobody has refreshed for this long are deleted when a process starts, and again
+# every PURGE_INTERVAL seconds by the prefetcher
+MAX_SNAPSHOT_AGE = 7 * 24 * 3600
+PURGE_INTERVAL = 3600
+
+# In-process copies kept per decorated function (least recently used are dropped first)
+MEMORY_ENTRIES = 128
+
+if int(pd.__version__.split(".")[0]) < 3:
+    # pandas 3 always copies on write; earlier versions need it switched on for shared_frame
+    pd.set_option("mode.copy_on_write", True)
+
+def shared_frame(frame):
+    # Hand a cached frame to a script run without copying its data. Under copy-on-write any
+    # column the caller modifies is copied first, so other readers never see the change.
+    return frame.copy(deep=False)
+
+def snapshot_key(name, *params):
+    # Stable file name for a query + its parameters
+    raw = json.dumps([name, [repr(param) for param in params]])
+    return f"{name}-{hashlib.sha256(raw.encode()).hexdigest()[:16]}"
+
+# Directory of Parquet snapshots. Writes go to a temp file and are renamed into place,
+# so readers in other processes only ever see complete files.
+class SnapshotStore:
+    def __init__(self, directory=SNAPSHOT_DIR, max_age=MAX_SNAPSHOT_AGE):
+        self.directory = directory
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+        self.purge()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def load(self, key):
+        # Returns (frame, fetched_at epoch seconds) or None if there is no usable snapshot
+        path = self.path(key)
+        try:
+            table = pq.read_table(path, memory_map=True)
+        except (OSError, pa.ArrowException):
+            return None
+        metadata = json.loads((table.schema.metadata or {}).get(b"snapshot", b"{}"))
+        return table.to_pandas(), metadata.get("fetched_at", 0.0)
+
+    def save(self, key, frame, fetched_at=None):
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+        except (pa.ArrowException, TypeError, ValueError):
+            # Columns Arrow can't type (mixed objects) just aren't persisted
+            return
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"snapshot"] = json.dumps({"key": key, "fetched_at": fetched_at}).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        tmp_path = f"{self.path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self.path(key))
+
+    @contextmanager
+    def lock(self, key, blocking=True):
+        # Cross-process lock so only one worker refreshes a snapshot at a time.
+        # Yields False when non-blocking and another process holds it.
+        if fcntl is None:
+            yield True
+            return
+        with open(f"{self.path(key)}.lock", "a") as handle:
+            flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+            try:
+                fcntl.flock(handle, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def purge(self):
+        # Old snapshots and temp files left by crashed writes, then the .lock files of
+        # snapshots that are gone
+        self._purged_at = time.time()
+        cutoff = self._purged_at - self.max_age
+        locks = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".lock"):
+                locks.append(entry)
+                continue
+            if not entry.name.endswith((".parquet", ".tmp")):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+        for entry in locks:
+            if not os.path.exists(entry.path[:-len(".lock")]):
+                self._remove_lock(entry.path)
+
+    def purge_if_due(self, interval=PURGE_INTERVAL):
+        if time.time() - self._purged_at >= interval:
+            self.purge()
+
+    def _remove_lock(self, path):
+        # Only while nobody holds it. A worker that opened it but hasn't locked it yet may end
+        # up locking the unlinked file and refresh alongside another; the rename keeps that safe.
+        if fcntl is None:
+            return
+        try:
+            with open(path, "a") as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                os.remove(path)
+        except OSError:  # BlockingIOError included: held by a refresh in progress
+            pass
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_snapshot_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore()
+        return _store
+
+# Memory + disk cache for a query function returning a DataFrame, with stale-while-revalidate:
+# a stale entry (in memory or on disk) is returned immediately while one background thread
+# re-runs the query and swaps the result in. Only a cold miss with no snapshot waits on Snowflake.
+class SnapshotCache:
+    def __init__(self, name, fetch, ttl):
+        self.name = name
+        self.ttl = ttl
+        self._fetch = fetch
+        self._signature = inspect.signature(fetch)
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (frame, fetched_at)
+        self._refreshing = set()
+        self._requested = OrderedDict()  # key -> (args, last requested), for the prefetcher
+
+    def arguments(self, args, kwargs=None):
+        # The call's arguments as one positional tuple with defaults filled in, so f(a, b),
+        # f(a, b, ()) and f(a, b, areas=()) share one entry
+        bound = self._signature.bind(*args, **(kwargs or {}))
+        bound.apply_defaults()
+        return bound.args
+
+    def get(self, *args, **kwargs):
+        args = self.arguments(args, kwargs)
+        key = snapshot_key(self.name, *args)
+        self._note_request(key, args)
+        with timed(f"cache.{self.name}", cache="hit") as sample:
+            entry = self._lookup(key)
+            if entry is None:
+                sample["cache"] = "miss"
+                entry = self._refresh(key, args)
+            elif time.time() - entry[1] >= self.ttl:
+                sample["cache"] = "stale"
+                self._refresh_in_background(key, args)
+            sample["rows"] = len(entry[0])
+        return shared_frame(entry[0])
+
+    def refresh(self, *args, reuse_if_fresh_for=0.0):
+        # Re-run the query now and swap the result in (used by the prefetcher). A snapshot
+        # another process wrote that stays fresh for reuse_if_fresh_for seconds is reused instead.
+        args = self.arguments(args)
+        return self._refresh(snapshot_key(self.name, *args), args, fresh_for=reuse_if_fresh_for, force=True)
+
+    def current_version(self, *args, **kwargs):
+        # When the entry get() returns was fetched; changes whenever a refresh swaps in a new
+        # result. A cold miss loads the entry first (as get() would), so a derived result keyed
+        # on it is stored against the version it was computed from.
+        args = self.arguments(args, kwargs)
+        key = snapshot_key(self.name, *args)
+        entry = self._lookup(key)
+        if entry is None:
+            entry = self._refresh(key, args)
+        return entry[1]
+
+    def expires_in(self, *args, **kwargs):
+        args = self.arguments(args, kwargs)
+        entry = self._lookup(snapshot_key(self.name, *args))
+        return 0.0 if entry is None else entry[1] + self.ttl - time.time()
+
+    def recent_requests(self, within):
+        # Argument tuples some script run asked for in the last `within` seconds
+        cutoff = time.time() - within
+        with self._lock:
+            return [args for args, requested_at in self._requested.values() if requested_at >= cutoff]
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        loaded = get_snapshot_store().load(key)
+        if loaded is not None:
+            self._remember(key, loaded)
+        return loaded
+
+    def _note_request(self, key, args):
+        with self._lock:
+            self._requested[key] = (args, time.time())
+            self._requested.move_to_end(key)
+            while len(self._requested) > MEMORY_ENTRIES:
+                self._requested.popitem(last=False)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def _refresh(self, key, args, fresh_for=0.0, force=False):
+        store = get_snapshot_store()
+        with store.lock(key):
+            # Another worker may have written a fresh snapshot while we waited for the lock
+            loaded = store.load(key)
+            with self._lock:
+                current = self._memory.get(key)
+            newer = loaded is not None and (not force or current is None or loaded[1] > current[1])
+            if newer and time.time() - loaded[1] < self.ttl - fresh_for:
+                entry = loaded
+            else:
+                fetched_at = time.time()
+                with timed(f"fetch.{self.name}") as sample:
+                    frame = self._fetch(*args)
+                    sample["rows"], sample["nbytes"] = frame_size(frame)
+                store.save(key, frame, fetched_at)
+                entry = (frame, fetched_at)
+        self._remember(key, entry)
+        return entry
+
+    def _refresh_in_background(self, key, args):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._refresh(key, args)
+            except Exception:
+                pass  # Keep serving the stale entry; the next read retries
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f"snapshot-refresh-{self.name}", daemon=True).start()
+
+def snapshot_cache(name, ttl=600):
+    # Decorator: @snapshot_cache("gs_query", ttl=600) in place of @st.cache_data(ttl=600)
+    def decorator(fetch):
+        cache = SnapshotCache(name, fetch, ttl)
+
+        @functools.wraps(fetch)
+        def wrapper(*args, **kwargs):
+            return cache.get(*args, **kwargs)
+
+        wrapper.cache = cache
+        wrapper.clear = cache.clear
+        return wrapper
+    return decorator
@@ -0,0 +1,221 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import streamlit as st
+from snowflake.snowpark import Session
+from snowflake.snowpark.context import get_active_session
+from transformation.arrow_frames import arrow_to_frame
+from transformation.perf import timed, frame_size
+
+# Maximum number of Snowflake sessions one Streamlit process keeps open
+POOL_SIZE = 4
+
+# Idle sessions older than this are pinged with SELECT 1 before being handed out
+HEALTH_CHECK_INTERVAL = 300
+
+# Snowflake error codes meaning the session (not the query) is dead:
+# 390111 session no longer exists, 390112 session expired, 390114 token expired
+RECONNECT_ERROR_CODES = {390111, 390112, 390114}
+
+def _connection_parameters():
+    return {
+        "account": st.secrets["snowflake"]["account"],
+        "user": st.secrets["snowflake"]["user"],
+        "password": st.secrets["snowflake"]["password"],
+        "role": st.secrets["snowflake"]["role"],
+        "warehouse": st.secrets["snowflake"]["warehouse"],
+        "database": st.secrets["snowflake"]["database"],
+        "schema": st.secrets["snowflake"]["schema"],
+    }
+
+def _create_session():
+    return Session.builder.configs(_connection_parameters()).create()
+
+def is_session_error(error):
+    # Snowpark wraps connector errors; check both the Snowpark and the connector error code
+    code = getattr(error, "sql_error_code", None) or getattr(error, "errno", None)
+    conn_error = getattr(error, "conn_error", None)
+    if code is None and conn_error is not None:
+        code = getattr(conn_error, "errno", None)
+    return code in RECONNECT_ERROR_CODES
+
+# Bounded, thread-safe pool of Snowpark sessions shared by all script runs in the process
+class SessionPool:
+    def __init__(self, create_session, max_size=POOL_SIZE, health_check_interval=HEALTH_CHECK_INTERVAL):
+        self._create_session = create_session
+        self._max_size = max_size
+        self._health_check_interval = health_check_interval
+        self._condition = threading.Condition()
+        self._idle = []  # (session, last_checked) pairs, most recently used last
+        self._size = 0
+        self._acquired = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._reconnects = 0
+
+    def acquire(self, timeout=None):
+        started = time.monotonic()
+        with self._condition:
+            while not self._idle and self._size >= self._max_size:
+                remaining = None if timeout is None else timeout - (time.monotonic() - started)
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No Snowflake session available after {timeout}s")
+                self._condition.wait(remaining)
+
+            waited = time.monotonic() - started
+            self._acquired += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            if waited > 0.001:
+                self._waits += 1
+
+            if self._idle:
+                session, last_checked = self._idle.pop()
+            else:
+                # Reserve the slot before connecting so other threads don't overshoot max_size
+                self._size += 1
+                session, last_checked = None, None
+
+        if session is None:
+            return self._connect()
+        if time.monotonic() - last_checked > self._health_check_interval and not self._is_healthy(session):
+            self._close(session)
+            with self._condition:
+                self._reconnects += 1
+            return self._connect()
+        return session
+
+    def release(self, session, discard=False):
+        with self._condition:
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append((session, time.monotonic()))
+            self._condition.notify()
+        if discard:
+            self._close(session)
+
+    @contextmanager
+    def session(self, timeout=None):
+        session = self.acquire(timeout)
+        try:
+            yield session
+        except Exception as error:
+            self.release(session, discard=is_session_error(error))
+            raise
+        else:
+            self.release(session)
+
+    def run(self, query, params=None):
+        # Run a query to a typed DataFrame (fetched as Arrow, see arrow_frames),
+        # retrying once on a fresh session if the token/session expired
+        try:
+            with self.session() as session:
+                return self._fetch(session, query, params)
+        except Exception as error:
+            if not is_session_error(error):
+                raise
+            with self._condition:
+                self._reconnects += 1
+            with self.session() as session:
+                return self._fetch(session, query, params)
+
+    @staticmethod
+    def _fetch(session, query, params):
+        # Timed separately: Snowflake (query + Arrow transfer) and the Arrow -> pandas conversion
+        with timed("snowflake.query") as sample:
+            table = session.sql(query, params=params).to_arrow()
+            sample["rows"], sample["nbytes"] = frame_size(table)
+        with timed("snowflake.to_pandas") as sample:
+            frame = arrow_to_frame(table)
+            sample["rows"], sample["nbytes"] = frame_size(frame)
+        return frame
+
+    def stats(self):
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self._max_size,
+                "acquired": self._acquired,
+                "waits": self._waits,
+                "total_wait_seconds": round(self._total_wait, 4),
+                "avg_wait_seconds": round(self._total_wait / self._acquired, 4) if self._acquired else 0.0,
+                "max_wait_seconds": round(self._max_wait, 4),
+                "reconnects": self._reconnects,
+            }
+
+    def _connect(self):
+        try:
+            return self._create_session()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    @staticmethod
+    def _is_healthy(session):
+        try:
+            session.sql("SELECT 1").collect()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(session):
+        try:
+            session.close()
+        except Exception:
+            pass
+
+# Inside Snowflake (Streamlit in Snowflake) there is one platform-owned session, so share it
+class ActiveSessionPool(SessionPool):
+    def __init__(self, session):
+        super().__init__(lambda: session, max_size=1)
+        self._active_session = session
+
+    def acquire(self, timeout=None):
+        with self._condition:
+            self._acquired += 1
+            self._size = 1
+        return self._active_session
+
+    def release(self, session, discard=False):
+        pass
+
+@st.cache_resource
+def get_session_pool():
+    try:
+        return ActiveSessionPool(get_active_session())
+    except Exception:
+        return SessionPool(_create_session)
+
+def snowflake_session():
+    # Context manager handing out a pooled session: `with snowflake_session() as session: ...`
+    return get_session_pool().session()
+
+def run_query(query, params=None):
+    return get_session_pool().run(query, params)
+
+def session_pool_stats():
+    return get_session_pool().stats()
+
+@st.cache_resource
+def get_query_executor():
+    # Threads for independent queries; more than the pool size would only queue for a session
+    return ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="snowflake-query")
+
+def run_concurrently(*calls):
+    # Run zero-argument callables (e.g. functools.partial over cached query functions) at the
+    # same time and return their results in order, so a cold load waits for the slowest query
+    # rather than the sum of them. The first exception is re-raised once all have finished.
+    futures = [get_query_executor().submit(call) for call in calls]
+    errors = [future.exception() for future in futures]
+    for error in errors:
+        if error is not None:
+            raise error
+    return [future.result() for future in futures]